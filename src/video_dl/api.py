@@ -0,0 +1,118 @@
+"""Extract and download videos in another asyncio program.
+
+Arguments are given by an Options instead of command line, so several runs
+with different arguments could share one process. connections could be
+shared with the program through its own aiohttp session, whose connector is
+used by spiders and never closed by them.
+
+every call runs in a separate task, so that resources of a run (semaphore,
+bandwidth limiter, progress, etc.) are never shared with others.
+
+bandwidth limit could be shared and changed at runtime, see set_rate.
+
+Typical usage:
+    from video_dl.api import Options, download, extract, set_rate
+
+    options = Options(directory='/tmp/videos', lists=True, progress='json')
+    async with aiohttp.ClientSession() as session:
+        videos = await extract(url, options, session=session)
+
+        set_rate('2M')  # before downloading, so that the limit is shared
+        task = asyncio.create_task(download(url, options, session=session))
+        set_rate('512K')  # slow down the running download
+        videos = await task
+"""
+from typing import List, Optional, Union
+import aiohttp
+import asyncio
+
+from video_dl.args import Options, options as current_options
+from video_dl.spider import Spider
+from video_dl.throttle import BandwidthLimiter
+from video_dl.toolbox import parse_size
+from video_dl.video import Video, archive, limiter, progress
+
+__all__ = ['Options', 'extract', 'download', 'set_rate']
+
+
+def set_rate(rate: Union[int, str], host: Optional[str] = None) -> dict:
+    """change bandwidth limit of downloads started from current context.
+
+    a limiter is created in current context if there is none, downloads
+    started after it share the limiter (`rate_limit` of their options is
+    ignored), so a new rate applies to them at once, even if they are
+    running.
+
+    Args:
+        rate: bytes per second, e.g.: 2097152 or '2M', 0 means no limit.
+        host: only limit medias from this host (and its subdomains).
+
+    Returns:
+        global rate and rates of specific hosts.
+    """
+    if limiter.get() is None:
+        limiter.set(BandwidthLimiter())
+    limiter.get().set_rate(parse_size(rate), host=host)
+    return limiter.get().rates()
+
+
+async def _run(url: str, options: Optional[Options],
+               session: Optional[aiohttp.ClientSession],
+               download_videos: bool) -> List[dict]:
+    """create a spider for url and run it with options.
+
+    Raises:
+        NotImplementedError: url is not supported.
+    """
+    current_options.set(options or Options())
+    spider = Spider.create(url)
+    connector = None if session is None else session.connector
+
+    try:
+        if download_videos:
+            await spider.run(connector)
+        else:
+            await spider.create_session(connector)
+            Video.prepare()
+            try:
+                await spider.before_download()
+            finally:
+                await spider.close_session()
+    finally:
+        if (reporter := progress.get()) is not None:
+            await reporter.close()
+        if (database := archive.get()) is not None:
+            database.close()
+    return [video.to_dict() for video in spider.video_list]
+
+
+async def extract(url: str, options: Optional[Options] = None, *,
+                  session: Optional[aiohttp.ClientSession] = None
+                  ) -> List[dict]:
+    """find videos in url and their medias without downloading them.
+
+    Args:
+        url: target url copied from online video website.
+        options: arguments of this run, defaults of command line if None.
+        session: share its connections, it won't be closed.
+
+    Returns:
+        videos found, see Video.to_dict.
+    """
+    return await asyncio.create_task(_run(url, options, session, False))
+
+
+async def download(url: str, options: Optional[Options] = None, *,
+                   session: Optional[aiohttp.ClientSession] = None
+                   ) -> List[dict]:
+    """download videos in url.
+
+    Args:
+        url: target url copied from online video website.
+        options: arguments of this run, defaults of command line if None.
+        session: share its connections, it won't be closed.
+
+    Returns:
+        videos downloaded, check `failed` of every one.
+    """
+    return await asyncio.create_task(_run(url, options, session, True))
@@ -0,0 +1,61 @@
+"""Remember downloaded videos, so that they could be skipped next time.
+
+Videos are indexed by site and an id which could be derived from url without
+fetching anything (e.g.: BV15L411p7M8_p2 or ep123456 for bilibili.com), so
+that a known video costs a single query of a local sqlite database.
+
+Typical usage:
+    archive = Archive('archive.db')
+    if not archive.has('bilibili.com', 'BV15L411p7M8_p1'):
+        ...  # download it
+        archive.add('bilibili.com', 'BV15L411p7M8_p1', path='a.mp4')
+"""
+import os
+import sqlite3
+import time
+
+
+class Archive(object):
+    """a sqlite index of downloaded videos."""
+
+    def __init__(self, path: str):
+        """Initialize an archive, create the database if necessary.
+
+        Args:
+            path: location of sqlite database.
+        """
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS videos ('
+            'site TEXT NOT NULL, video_id TEXT NOT NULL, size INTEGER, '
+            'path TEXT, created REAL, PRIMARY KEY (site, video_id))'
+        )
+        self._db.commit()
+
+    def has(self, site: str, video_id: str) -> bool:
+        """whether a video has been downloaded."""
+        row = self._db.execute(
+            'SELECT 1 FROM videos WHERE site = ? AND video_id = ?',
+            (site, video_id),
+        ).fetchone()
+        return row is not None
+
+    def add(self, site: str, video_id: str, path: str) -> None:
+        """record a downloaded video.
+
+        Args:
+            site: which site the video comes from.
+            video_id: unique id of the video in its site.
+            path: location of the video file.
+        """
+        size = os.path.getsize(path) if os.path.isfile(path) else None
+        self._db.execute(
+            'INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?)',
+            (site, video_id, size, path, time.time()),
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        """close the database."""
+        self._db.close()
@@ -1,21 +1,67 @@
 """read config from config file and user's input, then return the arguments.
 
+command line is parsed when an argument is read at the first time, unless
+arguments of current context are given by an Options (see video_dl.api).
+
 Typical usage:
     args = Arguments()
     cookie = args.cookie
     url = args.url
 
+    # read lazily as a class attribute
+    class Spider(object):
+        proxy = Setting('proxy')
+
+    # run something with other arguments
+    options.set(Options(directory='/tmp', lists=True))
+
 Available arguments:
-    big_file_threshold: file size exceeds this threshold will be sliced.
+    archive: a sqlite database remembers downloaded videos, '' disables it.
+    batch: a file contains urls to download, '-' means stdin.
+    big_file_threshold: maximum size of a media slice.
+    cache_dir: where to cache pages and api responses, '' disables it.
+    cache_max_size: maximum bytes of cached responses.
+    cache_ttl: seconds a cached response is used without revalidation.
     cookie: user's own cookie.
+    crawl_max_depth: pages followed from target url to find a video.
+    crawl_max_items: maximum pages crawled for a playlist, 0 means no limit.
+    crawl_workers: pages fetched at the same time when crawling a playlist.
+    danmaku_drop: drop danmaku which can't find a place on the crowded screen.
     directory: set a target directory to save video.
+    fsync: flush data to disk, 'never', 'range' (each slice) or 'close'.
+    host_rate_limit: bytes per second of specific hosts, e.g.: {"a.com": "1M"}.
     interactive: choose media resource manually.
+    keep_alive: reuse connections to the same host.
+    keepalive_timeout: seconds an idle connection will be kept in pool.
+    limit_per_host: maximum connections to the same host, 0 means no limit.
     lists: try to find a playlist and download all video contained in it.
     max_conn: maximum connections simultaneously.
+    max_jobs: urls processed at the same time in batch or daemon mode.
+    max_retries: retry a broken media slice at most this times.
+    max_videos: videos downloaded at the same time by a spider, 0 means all.
+    merge_workers: ffmpeg processes run simultaneously, 0 means cpu count.
+    min_chunk_size: size of the first media slice, slices grow from it.
+    order: which video first, 'playlist', 'smallest' or 'priority'.
+    prefer: patterns of titles go first with `--order priority`, in order.
+    preallocate: reserve disk space for target file before downloading.
+    progress: 'bar' draws a status line, 'json' emits json lines.
+    progress_interval: seconds between two progress reports.
     proxy: internet proxy.
+    queue_size: maximum jobs waiting in queue in daemon mode.
+    rate_limit: global bytes per second, e.g.: 2M. 0 means no limit.
+    read_timeout: seconds to wait for data before a slice is regarded broken.
+    resume: continue interrupted downloads instead of starting over.
+    retry_backoff: base seconds of exponential backoff between retries.
+    retry_backoff_max: maximum seconds of backoff between retries.
+    serve: run as a daemon accepting jobs on 'host:port' or an unix socket.
+    stream_merge: feed picture and sound to ffmpeg while downloading them.
     url: target url.
+    write_budget: maximum bytes waiting to be written to disk.
+    write_buffer_size: received chunks are coalesced up to this size.
 """
+from typing import Callable, List, Optional
 import argparse
+import contextvars
 import json
 import os
 
@@ -44,7 +90,7 @@ class Config(object):
 class ArgParse(object):
     """parse command line arguments with argparse."""
     def __init__(self):
-        parser = argparse.ArgumentParser(
+        self.parser = parser = argparse.ArgumentParser(
             prog='video_dl',
             description='A naive online video downloader based on aiohttp',
             epilog=('You could find more important information in '
@@ -62,6 +108,16 @@ class ArgParse(object):
             help='try to find a playlist and download all videos in it.',
         )
 
+        parser.add_argument(
+            '-r', '--resume', action='store_true',
+            help='resume interrupted downloads, skip completed ones.',
+        )
+
+        parser.add_argument(
+            '--stream-merge', action='store_true', default=None,
+            help='merge picture and sound while downloading them.',
+        )
+
         # something provided by user
         parser.add_argument(
             '-d', '--directory',
@@ -78,23 +134,105 @@ class ArgParse(object):
             help='set proxy. e.g.: http://127.0.0.1:10809',
         )
 
-        # required position arguments
         parser.add_argument(
-            'url', help='target url copied from online video website.',
+            '--rate-limit',
+            help='limit download speed of all videos. e.g.: 512K, 2M',
+        )
+
+        parser.add_argument(
+            '--archive', metavar='FILE',
+            help='skip videos recorded in this file, record new ones.',
+        )
+
+        parser.add_argument(
+            '--order', choices=['playlist', 'smallest', 'priority'],
+            help='which video of a playlist should be downloaded first.',
+        )
+
+        parser.add_argument(
+            '--prefer', metavar='PATTERN', action='append',
+            help=('with --order priority, videos whose title matches it go '
+                  'first. could be repeated, earlier ones go earlier.'),
+        )
+
+        parser.add_argument(
+            '--max-videos', type=int,
+            help='videos of a playlist downloaded at the same time.',
+        )
+
+        parser.add_argument(
+            '--progress', choices=['bar', 'json'],
+            help='how to report progress, json is friendly to other programs.',
+        )
+
+        parser.add_argument(
+            '-b', '--batch', metavar='FILE',
+            help='download all urls in a file, one url per line. - is stdin.',
+        )
+
+        parser.add_argument(
+            '--jobs', type=int, dest='max_jobs',
+            help='urls processed at the same time in batch or daemon mode.',
+        )
+
+        parser.add_argument(
+            '--serve', metavar='ADDRESS',
+            help=('run as a daemon, accept jobs over http on host:port '
+                  'or an unix socket path.'),
+        )
+
+        # position arguments, required if not in batch or daemon mode
+        parser.add_argument(
+            'url', nargs='?',
+            help='target url copied from online video website.',
         )
 
         # print program's version
         parser.add_argument('-v', '--version',
                             action='version', version=f'%(prog)s {version}')
 
-        # convert arguments parse result to dictionary
-        self.args = vars(parser.parse_args())
+    def parse(self, argv: Optional[List[str]] = None) -> dict:
+        """parse command line (sys.argv if argv is None) to a dictionary."""
+        args = vars(self.parser.parse_args(argv))
 
+        if args['serve'] is not None:
+            if args['url'] is not None or args['batch'] is not None:
+                self.parser.error('--serve accepts urls over http only')
+            if args['interactive']:
+                self.parser.error('--interactive conflicts with --serve')
+        elif args['url'] is None and args['batch'] is None:
+            self.parser.error('an url, --batch or --serve is required')
+        if args['batch'] == '-' and args['interactive']:
+            self.parser.error(
+                '--interactive needs stdin, conflicts with --batch -')
+        return args
 
-class Arguments(object):
-    """provide global variables to other modules."""
-    args = ArgParse().args  # arguments provided by user
-    config = Config().config  # auguments provided by config file
+    def defaults(self) -> dict:
+        """return arguments as if nothing is given in command line."""
+        return vars(self.parser.parse_args([]))
+
+
+class Options(object):
+    """arguments of a run, user's input takes precedence over config file."""
+    _config = None  # config file is read only once
+
+    def __init__(self, args: Optional[dict] = None, **kwargs):
+        """Initialize options.
+
+        Args:
+            args: parsed command line, defaults of command line if None.
+            kwargs: override arguments, names are the same as the ones in
+                `Available arguments`. e.g.: Options(directory='/tmp')
+        """
+        if Options._config is None:
+            Options._config = Config().config
+        self.config = Options._config  # auguments provided by config file
+        self.args = ArgParse().defaults() if args is None else dict(args)
+
+        for key, value in kwargs.items():
+            if key not in self.args and key not in self.config:
+                raise TypeError(f'unknown argument: {key}')
+            self.args[key] = value
 
     def _if_none_return_empty_string(self, key: str) -> str:
         """if value of the key is None, the return ''."""
@@ -112,6 +250,8 @@ class Arguments(object):
 
     def __getattr__(self, key: str) -> str:
         """return the argument provided by config file or user's input."""
+        if key.startswith('_') or key in ('args', 'config'):
+            raise AttributeError(key)
         if key not in self.args and key not in self.config:
             raise KeyError
         elif key not in self.args and key in self.config:
@@ -126,3 +266,44 @@ class Arguments(object):
 
         setattr(self, key, value)
         return value
+
+
+# arguments of current context, command line's are used if it's not set
+options = contextvars.ContextVar('Options', default=None)
+
+
+class Arguments(object):
+    """provide arguments of current context to other modules."""
+    _command_line = None  # options parsed from command line
+
+    @classmethod
+    def current(cls) -> Options:
+        """return options of current context, parse command line if needed.
+        """
+        if (current := options.get()) is not None:
+            return current
+        if Arguments._command_line is None:
+            Arguments._command_line = Options(ArgParse().parse())
+        return Arguments._command_line
+
+    def __getattr__(self, key: str) -> str:
+        """return the argument provided by config file or user's input."""
+        return getattr(self.current(), key)
+
+
+class Setting(object):
+    """a class attribute reads an argument of current context lazily."""
+
+    def __init__(self, key: str, convert: Optional[Callable] = None):
+        """Initialize a setting.
+
+        Args:
+            key: name of argument.
+            convert: convert the argument before returning it.
+        """
+        self.key = key
+        self.convert = convert
+
+    def __get__(self, instance, owner=None):
+        value = getattr(Arguments.current(), self.key)
+        return value if self.convert is None else self.convert(value)
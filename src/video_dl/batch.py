@@ -0,0 +1,145 @@
+"""Download videos from many urls in one event loop.
+
+All spiders share the same connector, connection slots, bandwidth limiter and
+progress reporter, and a limited number of urls will be processed at the same
+time. A summary will be printed after all urls are processed.
+
+Typical usage:
+    urls = read_urls('urls.txt')  # or read_urls('-') to read from stdin
+    batch = Batch(urls, max_jobs=4)
+    await batch.run()
+    batch.summary()
+"""
+from typing import List, Optional
+import asyncio
+import json
+import sys
+import time
+import uuid
+
+from prettytable import PrettyTable
+
+from video_dl.spider import Spider
+from video_dl.toolbox import Output, info
+from video_dl.video import Video
+
+
+def read_urls(file_path: str) -> List[str]:
+    """read urls from a file, '-' means stdin.
+
+    blank lines and lines start with '#' will be ignored.
+    """
+    if file_path == '-':
+        lines = sys.stdin.readlines()
+    else:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+
+    return [line.strip() for line in lines
+            if line.strip() and not line.strip().startswith('#')]
+
+
+class Job(object):
+    """download videos from an url."""
+
+    def __init__(self, url: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.site = None
+        self.status = 'pending'  # pending, running, done, failed, cancelled
+        self.task = None  # set by whoever runs it in a separate task
+        self.error = None
+        self.videos = 0  # count of videos found
+        self.failed_videos = 0  # count of videos couldn't be downloaded
+        self.elapsed = 0
+
+    async def run(self, connector=None) -> None:
+        """create a spider for url and run it, never raise exceptions.
+
+        Args:
+            connector: share connections with other jobs.
+        """
+        self.status = 'running'
+        start_time = time.monotonic()
+        try:
+            spider = Spider.create(self.url)
+            self.site = spider.site
+            try:
+                await spider.run(connector)
+            finally:
+                self.videos = len(spider.video_list)
+                self.failed_videos = sum(
+                    video.failed for video in spider.video_list)
+        except NotImplementedError:
+            self.status, self.error = 'failed', 'unsupported url'
+        except Exception as e:  # pylint: disable=W0703
+            self.status, self.error = 'failed', f'{type(e).__name__} {e}'
+        else:
+            if self.failed_videos:
+                self.status = 'failed'
+                self.error = f'{self.failed_videos} video(s) failed'
+            else:
+                self.status = 'done'
+        finally:
+            self.elapsed = time.monotonic() - start_time
+
+    def to_dict(self) -> dict:
+        """return a dictionary describes this job."""
+        return {
+            'id': self.id,
+            'url': self.url,
+            'site': self.site,
+            'status': self.status,
+            'videos': self.videos,
+            'failed_videos': self.failed_videos,
+            'elapsed': round(self.elapsed, 2),
+            'error': self.error,
+        }
+
+
+class Batch(object):
+    """run jobs concurrently with shared resources."""
+
+    def __init__(self, urls: List[str], max_jobs: Optional[int] = 4):
+        """Initialize a batch.
+
+        Args:
+            urls: target urls.
+            max_jobs: urls processed at the same time.
+        """
+        self.jobs = [Job(url) for url in urls]
+        self.max_jobs = max(max_jobs, 1)
+
+    async def run(self) -> None:
+        """run all jobs, return after all of them are finished."""
+        Video.prepare()  # shared by all jobs
+        connector = Spider.create_connector()
+        slots = asyncio.Semaphore(self.max_jobs)
+
+        async def run_job(job: Job) -> None:
+            async with slots:
+                info('job', f'start {job.url}')
+                await job.run(connector)
+                info('job', f'{job.status} {job.url}')
+
+        try:
+            await asyncio.gather(*[run_job(job) for job in self.jobs])
+        finally:
+            await connector.close()
+
+    def summary(self) -> None:
+        """print result of every job."""
+        if Output.json:
+            for job in self.jobs:
+                print(json.dumps({'event': 'result', **job.to_dict()},
+                                 ensure_ascii=False))
+            return
+
+        tb = PrettyTable()
+        tb.field_names = ['url', 'site', 'status', 'videos', 'time', 'error']
+        tb.align['url'] = 'l'
+        for job in self.jobs:
+            tb.add_row([job.url, job.site or '', job.status,
+                        f'{job.videos - job.failed_videos}/{job.videos}',
+                        f'{job.elapsed:.2f}s', job.error or ''])
+        print(tb)
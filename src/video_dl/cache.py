@@ -0,0 +1,199 @@
+"""Cache web pages and api responses on disk.
+
+A cached response is used directly within its ttl. After that it will be
+revalidated with ETag/Last-Modified, so that an unchanged page costs a 304
+response only. Least recently used responses are evicted when the cache grows
+too big.
+
+Responses of signed urls (which expire soon) should never be cached, see
+is_signed. A response contains signed urls (e.g.: media urls with a deadline in
+a web page) is only used in the first half of their life, and never
+revalidated after that, see embedded_expiry.
+
+Typical usage:
+    cache = HttpCache('~/.cache/video_dl', ttl=600, max_size=256 * 1024 * 1024)
+    key = cache.key('get', url)
+    if (entry := cache.get(key)) is not None and entry.fresh:
+        return entry.body
+    ...  # fetch it with entry.validators() as headers
+    cache.put(key, body, url=url, headers=response.headers)
+"""
+from typing import Optional
+from urllib.parse import parse_qsl, urlparse
+import hashlib
+import json
+import os
+import re
+import time
+
+
+# expiry time of signed urls in a body, `&` may be escaped as `\u0026`
+re_embedded_expiry = re.compile(
+    rb'(?<![A-Za-z_])(?:deadline|expires)=(\d{9,11})')
+
+
+def is_signed(url: str) -> bool:
+    """whether url contains a signature or an expiry time."""
+    signed_params = {'sign', 'signature', 'expires', 'deadline', 'token',
+                     'auth_key', 'wts', 'w_rid'}
+    query = parse_qsl(urlparse(url).query, keep_blank_values=True)
+    return any(key.lower() in signed_params for key, _ in query)
+
+
+def embedded_expiry(body: bytes) -> Optional[int]:
+    """return the earliest expiry time of signed urls in body, None if there
+    is none."""
+    return min(map(int, re_embedded_expiry.findall(body)), default=None)
+
+
+class CacheEntry(object):
+    """a cached response."""
+
+    def __init__(self, meta: dict, body: bytes, ttl: float):
+        self.url = meta['url']  # url after redirection
+        self.encoding = meta['encoding']
+        self.etag = meta['etag']
+        self.last_modified = meta['last_modified']
+        self.stored_at = meta['stored_at']
+        self.usable_until = meta.get('usable_until')  # see embedded_expiry
+        self.body = body
+
+        self.usable = (self.usable_until is None
+                       or time.time() < self.usable_until)
+        self.fresh = self.usable and time.time() - self.stored_at < ttl
+
+    def validators(self) -> dict:
+        """return headers used to revalidate this response."""
+        headers = {}
+        if self.etag:
+            headers['if-none-match'] = self.etag
+        if self.last_modified:
+            headers['if-modified-since'] = self.last_modified
+        return headers
+
+
+class HttpCache(object):
+    """store responses in a directory, one file per response."""
+
+    def __init__(self, directory: str, *, ttl: float, max_size: int):
+        """Initialize a http cache.
+
+        Args:
+            directory: where to store responses, created if necessary.
+            ttl: seconds a response could be used without revalidation.
+            max_size: maximum bytes of all stored responses.
+        """
+        self.directory = os.path.expanduser(directory)
+        self.ttl = ttl
+        self.max_size = max_size
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._size = sum(os.path.getsize(path) for path in self._files())
+
+    @staticmethod
+    def key(method: str, url: str, *parts) -> str:
+        """return a key of request, parts could be params, cookie, etc.."""
+        text = json.dumps([method.lower(), url, *parts], sort_keys=True,
+                          default=str)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.cache')
+
+    def _files(self) -> list:
+        return [os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith('.cache')]
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """return a cached response, None if not exist.
+
+        a response whose signed urls are (nearly) expired is regarded as
+        not exist, it shouldn't be revalidated.
+        """
+        try:
+            with open(self._path(key), 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if (entry := CacheEntry(meta, body, self.ttl)).usable is False:
+            return None
+
+        try:
+            os.utime(self._path(key))  # recently used
+        except OSError:  # evicted by others
+            pass
+        return entry
+
+    def put(self, key: str, body: bytes, *, url: str, headers,
+            encoding: Optional[str] = 'utf-8') -> None:
+        """store a response.
+
+        Args:
+            key: key of request.
+            body: response's body.
+            url: url after redirection.
+            headers: response's headers, validators are read from it.
+            encoding: encoding of body.
+        """
+        if 'no-store' in headers.get('cache-control', ''):
+            return
+
+        # leave the second half of life of signed urls for downloading
+        usable_until = None
+        if (expiry := embedded_expiry(body)) is not None:
+            now = time.time()
+            if expiry <= now:
+                return
+            usable_until = now + (expiry - now) / 2
+
+        self._store(key, body, url=url, encoding=encoding,
+                    etag=headers.get('etag'),
+                    last_modified=headers.get('last-modified'),
+                    usable_until=usable_until)
+
+    def refresh(self, key: str, entry: CacheEntry) -> None:
+        """mark a revalidated (304) response as fresh again."""
+        self._store(key, entry.body, url=entry.url, encoding=entry.encoding,
+                    etag=entry.etag, last_modified=entry.last_modified,
+                    usable_until=entry.usable_until)
+        entry.fresh = True
+
+    def _store(self, key: str, body: bytes, **meta) -> None:
+        """write a file atomically, then evict old files if necessary."""
+        meta['stored_at'] = time.time()
+        data = json.dumps(meta).encode('utf-8') + b'\n' + body
+
+        path = self._path(key)
+        if os.path.exists(path):
+            self._size -= os.path.getsize(path)
+
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._size += len(data)
+
+        if self._size > self.max_size:
+            self.evict()
+
+    def evict(self) -> None:
+        """remove least recently used responses until size is acceptable."""
+        files = []
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        self._size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if self._size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
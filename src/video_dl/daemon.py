@@ -0,0 +1,182 @@
+"""Keep running and download videos for jobs submitted over HTTP.
+
+The event loop, connector, site modules and other shared resources are only
+created once. Jobs are put into a bounded queue and processed by a limited
+number of workers.
+
+Available api (json in, json out):
+    POST /jobs {"url": "..."}: submit a job, 503 if queue is full.
+    GET /jobs: list all jobs.
+    GET /jobs/<id>: status of a job.
+    DELETE /jobs/<id>: cancel a pending or running job.
+    GET /rate: global rate limit and rate limits of specific hosts.
+    PUT /rate {"rate": "2M", "host": "..."}: change rate limit of all jobs
+        (or a host if given) at runtime, 0 means no limit.
+
+Typical usage:
+    daemon = Daemon('127.0.0.1:8765')  # or a unix socket: '/tmp/video-dl.sock'
+    await daemon.serve()
+"""
+from typing import Optional
+import asyncio
+
+from aiohttp import web
+
+from video_dl.batch import Job
+from video_dl.spider import Spider
+from video_dl.toolbox import info, parse_size
+from video_dl.video import Video, limiter
+
+
+class Daemon(object):
+    """a local http server manages download jobs."""
+    max_history = 1000  # finished jobs kept for querying
+
+    def __init__(self, address: str, *, max_jobs: Optional[int] = 4,
+                 queue_size: Optional[int] = 100):
+        """Initialize a daemon.
+
+        Args:
+            address: 'host:port' to listen on, or path of an unix socket.
+            max_jobs: jobs processed at the same time.
+            queue_size: maximum jobs waiting in queue.
+        """
+        self.address = address
+        self.max_jobs = max(max_jobs, 1)
+        self.queue_size = queue_size
+
+        self.jobs = {}  # id -> Job
+        self.queue = None  # created in event loop, see serve
+        self.connector = None
+
+        # shared by all jobs, http handlers run outside the context of serve
+        self.limiter = None
+
+    def create_app(self) -> web.Application:
+        """create a web application with routes of job api."""
+        app = web.Application()
+        app.router.add_post('/jobs', self.submit)
+        app.router.add_get('/jobs', self.list)
+        app.router.add_get('/jobs/{id}', self.status)
+        app.router.add_delete('/jobs/{id}', self.cancel)
+        app.router.add_get('/rate', self.get_rate)
+        app.router.add_put('/rate', self.set_rate)
+        return app
+
+    async def serve(self) -> None:
+        """start workers and http server, run until cancelled."""
+        # python < 3.10 binds queue to the loop at creation
+        self.queue = asyncio.Queue(self.queue_size)
+        Video.prepare()  # shared by all jobs
+        self.limiter = limiter.get()
+        self.connector = Spider.create_connector()
+        workers = [asyncio.create_task(self.work())
+                   for _ in range(self.max_jobs)]
+
+        runner = web.AppRunner(self.create_app())
+        await runner.setup()
+        if ':' in self.address:
+            host, port = self.address.rsplit(':', 1)
+            site = web.TCPSite(runner, host or '127.0.0.1', int(port))
+        else:
+            site = web.UnixSite(runner, self.address)
+        await site.start()
+        info('serve', f'listening on {self.address}')
+
+        try:
+            await asyncio.Event().wait()  # forever
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await runner.cleanup()
+            await self.connector.close()
+
+    async def work(self) -> None:
+        """take jobs from queue and run them one by one."""
+        while True:
+            job = await self.queue.get()
+            if job.status != 'pending':  # cancelled in queue
+                continue
+
+            job.task = asyncio.create_task(job.run(self.connector))
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                if not job.task.cancelled():  # daemon is shutting down
+                    job.task.cancel()
+                    raise
+                job.status = 'cancelled'
+            info('job', f'{job.status} {job.url}')
+            self._forget_finished()
+
+    def _forget_finished(self) -> None:
+        """drop the oldest finished jobs if there are too many."""
+        finished = [key for key, job in self.jobs.items()
+                    if job.status in ('done', 'failed', 'cancelled')]
+        for key in finished[:max(len(finished) - self.max_history, 0)]:
+            del self.jobs[key]
+
+    async def submit(self, request: web.Request) -> web.Response:
+        """POST /jobs"""
+        try:
+            url = (await request.json())['url']
+        except (ValueError, KeyError, TypeError):
+            raise web.HTTPBadRequest(text='json with an url is required')
+
+        job = Job(url)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise web.HTTPServiceUnavailable(text='too many jobs in queue')
+
+        self.jobs[job.id] = job
+        info('job', f'queued {url}')
+        return web.json_response(job.to_dict(), status=201)
+
+    async def list(self, request: web.Request) -> web.Response:
+        """GET /jobs"""
+        del request
+        return web.json_response([job.to_dict() for job in self.jobs.values()])
+
+    def _get_job(self, request: web.Request) -> Job:
+        """find job by id in url."""
+        try:
+            return self.jobs[request.match_info['id']]
+        except KeyError:
+            raise web.HTTPNotFound(text='no such job')
+
+    async def status(self, request: web.Request) -> web.Response:
+        """GET /jobs/<id>"""
+        return web.json_response(self._get_job(request).to_dict())
+
+    async def cancel(self, request: web.Request) -> web.Response:
+        """DELETE /jobs/<id>"""
+        job = self._get_job(request)
+        if job.status == 'pending':
+            job.status = 'cancelled'
+        elif job.status == 'running':
+            job.task.cancel()
+        else:
+            raise web.HTTPConflict(text=f'job is {job.status} already')
+        return web.json_response(job.to_dict())
+
+    async def get_rate(self, request: web.Request) -> web.Response:
+        """GET /rate"""
+        del request
+        return web.json_response(self.limiter.rates())
+
+    async def set_rate(self, request: web.Request) -> web.Response:
+        """PUT /rate"""
+        try:
+            body = await request.json()
+            rate = parse_size(body['rate'])
+            host = body.get('host')
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise web.HTTPBadRequest(text='json with a rate is required')
+        if rate < 0:
+            raise web.HTTPBadRequest(text='rate should not be negative')
+
+        self.limiter.set_rate(rate, host=host)
+        info('rate', f'{host or "all"}: {rate} bytes/s')
+        return web.json_response(self.limiter.rates())
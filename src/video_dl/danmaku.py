@@ -13,16 +13,119 @@ Typical usage:
     dia_log = danmaku.genera_dialog(**meta_data)
     danmaku.add(dia_log)
     danmaku.output_subtitle()
+
+    # or write subtitles to a file while generating them
+    with open('a.ass', 'w', encoding='utf-8') as f:
+        danmaku = Danmaku(output=f)
+        ...
+
+    # danmaku should be placed in order of start time, so that they won't
+    # overlap with each other
+    lane = danmaku.place('top', start=230, duration=4000, content='lol')
+    dia_log = danmaku.generate_dialog(**meta_data, lane=lane)
 """
-from typing import Optional
+from typing import Optional, TextIO
+import heapq
 import os
 import random
 
+from video_dl.args import Setting
+
+
+class ScrollLanes(object):
+    """rows for danmaku moving across the screen."""
+
+    def __init__(self, count: int, width: int):
+        """Initialize scroll lanes.
+
+        Args:
+            count: number of rows.
+            width: width of screen.
+        """
+        self.width = width
+
+        # lanes whose last danmaku has entered the screen completely, the
+        # one whose last danmaku leaves first is preferred: (leave, lane)
+        self._entered = [(0, lane) for lane in range(count)]
+        # lanes whose last danmaku is entering: (enter, leave, lane)
+        self._entering = []
+
+    def allocate(self, start: int, duration: int, length: int) -> Optional[int]:
+        """return a lane for a danmaku, None if all lanes are occupied.
+
+        Args:
+            start: start time (ms) of danmaku, shouldn't be less than the
+                previous one's.
+            duration: time (ms) to move across the screen.
+            length: length of danmaku in pixels.
+        """
+        while self._entering and self._entering[0][0] <= start:
+            _, leave, lane = heapq.heappop(self._entering)
+            heapq.heappush(self._entered, (leave, lane))
+
+        if not self._entered:
+            return None
+
+        # danmaku won't catch up with the previous one in this lane, if the
+        # previous one leaves before this one reaches the other side
+        speed = (self.width + length) / duration
+        leave, lane = self._entered[0]
+        if leave > start + self.width / speed:
+            return None
+
+        heapq.heappop(self._entered)
+        heapq.heappush(self._entering,
+                       (start + length / speed, start + duration, lane))
+        return lane
+
+
+class FixedLanes(object):
+    """rows for danmaku staying at top or bottom."""
+
+    def __init__(self, count: int):
+        """Initialize fixed lanes.
+
+        Args:
+            count: number of rows.
+        """
+        self._free = list(range(count))  # the nearest row is preferred
+        self._busy = []  # (end, lane)
+
+    def allocate(self, start: int, duration: int, length: int) -> Optional[int]:
+        """return a lane for a danmaku, None if all lanes are occupied.
+
+        Args:
+            start: start time (ms) of danmaku, shouldn't be less than the
+                previous one's.
+            duration: time (ms) to stay on the screen.
+            length: length of danmaku in pixels, not used.
+        """
+        del length
+        while self._busy and self._busy[0][0] <= start:
+            _, lane = heapq.heappop(self._busy)
+            heapq.heappush(self._free, lane)
+
+        if not self._free:
+            return None
+
+        lane = heapq.heappop(self._free)
+        heapq.heappush(self._busy, (start + duration, lane))
+        return lane
+
 
 class Danmaku(object):
     """Danmaku."""
-    def __init__(self, ass_file_path: Optional[str] = None):
-        """read ass header from disk."""
+    drop_crowded = Setting('danmaku_drop')
+
+    def __init__(self, ass_file_path: Optional[str] = None,
+                 output: Optional[TextIO] = None):
+        """read ass header from disk.
+
+        Args:
+            ass_file_path: ass header, default: resource/ass_header.txt
+            output: write header and dialogues to it immediately instead of
+                holding them in memory.
+        """
         if not ass_file_path:
             ass_file_path = os.path.join(
                 os.path.dirname(__file__), 'resource', 'ass_header.txt')
@@ -32,8 +135,22 @@ class Danmaku(object):
 
         self.screen_width = 560
         self.screen_height = 420
+        self.line_height = 16  # font size in ass header is 14
+        self.char_width = 12
 
+        self.output = output
         self.subtitles = []
+        self.create_lanes()
+
+    def create_lanes(self) -> None:
+        """divide screen into lanes."""
+        count = max(int(self.screen_height) // self.line_height, 1)
+        self.lanes = {
+            'normal': ScrollLanes(count, int(self.screen_width)),
+            'reverse': ScrollLanes(count, int(self.screen_width)),
+            'top': FixedLanes(count),
+            'bottom': FixedLanes(count),
+        }
 
     def edit_header(self, title: str,
                     width: Optional[str] = None,
@@ -53,16 +170,40 @@ class Danmaku(object):
         self.ass_header = self.ass_header.replace('@width@', str(width))
         self.ass_header = self.ass_header.replace('@height@', str(height))
 
-        self.subtitles.append(self.ass_header)
+        self.add_dialog(self.ass_header)
+        self.create_lanes()
+
+    def place(self, mode: str, *, start: int, duration: int,
+              content: str) -> Optional[int]:
+        """find a lane where danmaku won't overlap with others.
+
+        danmaku should be placed in order of start time.
+
+        Args:
+            mode: 'normal', 'reverse', 'top' or 'bottom'.
+            start: start time in ms.
+            duration: time in ms the danmaku stays on the screen.
+            content: text of danmaku.
+
+        Returns:
+            lane's index, None if screen is too crowded.
+        """
+        return self.lanes[mode].allocate(
+            start, duration, self.char_width * len(content))
 
-    # TODO: advanced algorithm
     def generate_dialog(self, *, start: str, end: str, mode: str, content: str,
                         fontsize: Optional[str] = '',
                         color: Optional[str] = '',
+                        lane: Optional[int] = None,
                         ) -> str:
-        """generate dialog with meta data."""
-        height = random.randint(0, self.screen_height)  # need to be improved
-        content_len = 12 * len(content)
+        """generate dialog with meta data, at a random height if no lane."""
+        if lane is None:
+            height = random.randint(0, self.screen_height)
+        elif mode == 'bottom':
+            height = self.screen_height - lane * self.line_height
+        else:
+            height = lane * self.line_height
+        content_len = self.char_width * len(content)
 
         if mode == 'normal':
             move = (r'\an7\move('
@@ -83,9 +224,12 @@ class Danmaku(object):
         return f'Dialogue: 0,{start},{end},Danmaku,,0,0,0,,{code}{content}'
 
     def add_dialog(self, dialog: str) -> None:
-        """add a dialogue into subtitles."""
-        self.subtitles.append(dialog)
+        """add a dialogue into subtitles, or write it to output."""
+        if self.output is None:
+            self.subtitles.append(dialog)
+        else:
+            self.output.write(f'{dialog}\n')
 
     def output_subtitle(self) -> str:
-        """return subtitle."""
+        """return subtitle, nothing if it has been written to output."""
         return '\n'.join(self.subtitles)
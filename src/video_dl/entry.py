@@ -4,9 +4,11 @@ import platform
 import time
 
 from video_dl.args import Arguments
+from video_dl.batch import Batch, read_urls
+from video_dl.daemon import Daemon
 from video_dl.spider import Spider
-from video_dl.toolbox import info
-import video_dl.sites
+from video_dl.toolbox import Output, info
+from video_dl.video import progress
 
 
 if platform.system() != 'Windows':
@@ -16,12 +18,36 @@ else:
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 
-def main():
-    # get url from command line's augument and create a specifc spider.
-    spider = Spider.create(Arguments().url)
+async def run_and_report(coroutine) -> None:
+    """run a coroutine, and wait until progress report is done."""
+    await coroutine
+    if (reporter := progress.get()) is not None:
+        await reporter.close()
+
 
-    # start spider and download video.
+def main():
+    args = Arguments()
+    Output.json = args.progress == 'json'
     start_time = time.time()
-    asyncio.run(spider.run())
+
+    if args.serve:
+        # keep running and download urls submitted over http.
+        daemon = Daemon(args.serve, max_jobs=args.max_jobs,
+                        queue_size=args.queue_size)
+        try:
+            asyncio.run(daemon.serve())
+        except KeyboardInterrupt:
+            pass
+    elif args.batch:
+        # download all urls in a file through one event loop.
+        batch = Batch(read_urls(args.batch), args.max_jobs)
+        asyncio.run(run_and_report(batch.run()))
+        batch.summary()
+    else:
+        # get url from command line's augument and create a specifc spider.
+        spider = Spider.create(args.url)
+
+        # start spider and download video.
+        asyncio.run(run_and_report(spider.run()))
 
     info('done', f'had wasted your time: {time.time() - start_time:.2f}s!')
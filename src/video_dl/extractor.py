@@ -3,7 +3,13 @@
 Typical usage:
     url = 'https://www.bilibili.com/video/BV15L411p7M8'
     extractor = Extractor.create(url)  # will return a BilibiliVideoExtractor
+
+    # stop reading html as soon as the information needed is received
+    resp, _ = await spider.fetch_html(url, markers=extractor.markers)
 """
+from typing import List, Optional, Tuple
+
+from video_dl.sites import host_suffixes, load
 
 
 class Extractor(object):
@@ -13,12 +19,86 @@ class Extractor(object):
         pattern: Extractor will use this list to create a specific Spider for target url.
          For example, BilibiliVideoExtractor's pattern is [re.compile('bilibili.com/video/BV.*')],
          will auto match to a url like 'https://www.bilibili.com/video/BV346'.
+         patterns should start with host name, by which subclasses are
+         indexed.
+
+    subclass of Extractor could provide a public attribute:
+        markers: where the information needed ends in html source code, a
+            marker is a tuple of strings appear in order, just like literals
+            in a lazy regex. e.g.: ('VIDEO_SHOW', '{', '};') for pattern
+            'VIDEO_SHOW.*?({.*?});'. html after all markers will not be read.
     """
+    markers = []
+
+    # host name -> subclasses of Extractor
+    extractors = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for pattern in cls.__dict__.get('pattern', []):
+            host = pattern.pattern.split('/', 1)[0].replace('\\', '')
+            subclasses = Extractor.extractors.setdefault(host, [])
+            if cls not in subclasses:
+                subclasses.append(cls)
+
+    @classmethod
+    def find(cls, url: str) -> Optional[type]:
+        """return a specific subclass of Extractor depends on url."""
+        load(url)
+        for host in host_suffixes(url):
+            for subclass in cls.extractors.get(host, []):
+                for pattern in subclass.pattern:
+                    if pattern.search(url):
+                        return subclass
+        return None
+
     @classmethod
     def create(cls, url: str):
         """return a specific Extractor depends on url."""
-        for subclass in cls.__subclasses__():
-            for pattern in subclass.pattern:
-                if pattern.search(url):
-                    return subclass()
-        raise NotImplementedError
+        if (subclass := cls.find(url)) is None:
+            raise NotImplementedError
+        return subclass()
+
+    @classmethod
+    def get_markers(cls, url: str) -> list:
+        """return markers of the extractor for url, [] if there is none."""
+        subclass = cls.find(url)
+        return [] if subclass is None else subclass.markers
+
+
+class MarkerScanner(object):
+    """find markers in a growing buffer, every byte is scanned only once."""
+
+    def __init__(self, markers: List[Tuple[str, ...]]):
+        """Initialize a marker scanner.
+
+        Args:
+            markers: tuples of strings appear in order.
+        """
+        self.markers = [[part.encode('utf-8') for part in marker]
+                        for marker in markers]
+        self._steps = [0] * len(markers)  # parts found of every marker
+        self._positions = [0] * len(markers)  # where to continue searching
+
+    @property
+    def end(self) -> int:
+        """position after the last marker, valid when all are found."""
+        return max(self._positions, default=0)
+
+    def feed(self, buffer: bytearray) -> bool:
+        """search newly received bytes in buffer, True if all markers found.
+        """
+        found_all = True
+        for index, marker in enumerate(self.markers):
+            while self._steps[index] < len(marker):
+                part = marker[self._steps[index]]
+                position = buffer.find(part, self._positions[index])
+                if position == -1:
+                    # a part may be split by chunks
+                    self._positions[index] = max(
+                        self._positions[index], len(buffer) - len(part) + 1)
+                    found_all = False
+                    break
+                self._positions[index] = position + len(part)
+                self._steps[index] += 1
+        return found_all
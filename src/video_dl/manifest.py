@@ -0,0 +1,110 @@
+"""Record which byte ranges of a media have already been downloaded.
+
+A manifest is a small json file stored next to the target file. It remembers
+the size reported by server and a list of completed byte ranges, so that an
+interrupted download could be resumed without requesting these ranges again.
+
+Typical usage:
+    manifest = Manifest('./video_picture.mp4')
+    manifest.load(size=1024)  # discard stale records if size was changed
+    for start, stop in manifest.missing(0, 1024):
+        ...  # download bytes in [start, stop)
+        manifest.add(start, stop)
+    manifest.remove()  # all done
+"""
+from typing import List, Tuple
+import json
+import os
+
+
+class Manifest(object):
+    """completed byte ranges of a media, all ranges are half-open."""
+    suffix = '.vdl'
+
+    def __init__(self, location: str):
+        """Initialize a manifest.
+
+        Args:
+            location: target location of media, manifest will be saved to
+                the same folder with an extra suffix.
+        """
+        self.path = f'{location}{self.suffix}'
+        self.size = 0
+        self.ranges = []
+
+    def load(self, size: int) -> None:
+        """read completed ranges from disk.
+
+        records will be discarded if they don't belong to a media with the
+        same size, because server may have changed its resource.
+
+        Args:
+            size: media's real size fetched from server.
+        """
+        self.size = size
+        self.ranges = []
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if data.get('size') != size:
+            return
+
+        for start, stop in data.get('ranges', []):
+            if 0 <= start < stop <= size:
+                self.add(start, stop, save=False)
+
+    def save(self) -> None:
+        """write completed ranges to disk."""
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'size': self.size, 'ranges': self.ranges}, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        """delete manifest file if exists."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def add(self, start: int, stop: int, save: bool = True) -> None:
+        """mark [start, stop) as completed, overlapped ranges will be merged.
+
+        Args:
+            start: first byte of completed range.
+            stop: the byte after the last one of completed range.
+            save: write to disk immediately or not.
+        """
+        if start >= stop:
+            return
+
+        ranges = []
+        for item in sorted(self.ranges + [[start, stop]]):
+            if ranges and item[0] <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], item[1])
+            else:
+                ranges.append(list(item))
+        self.ranges = ranges
+
+        if save:
+            self.save()
+
+    def missing(self, start: int, stop: int) -> List[Tuple[int, int]]:
+        """return uncompleted ranges between start and stop."""
+        result = []
+        for done_start, done_stop in self.ranges:
+            if done_stop <= start or done_start >= stop:
+                continue
+            if done_start > start:
+                result.append((start, done_start))
+            start = max(start, done_stop)
+        if start < stop:
+            result.append((start, stop))
+        return result
+
+    @property
+    def completed(self) -> int:
+        """return count of completed bytes."""
+        return sum(stop - start for start, stop in self.ranges)
@@ -0,0 +1,85 @@
+"""Choose the best one from several equivalent urls of a media.
+
+Every request picks a mirror by its measured throughput and the connections
+already opened to it, so that ranges of a media are spread across mirrors and
+slow mirrors get less work. A failed mirror will be avoided for a while.
+
+Typical usage:
+    mirrors = MirrorPool(['https://a.com/1.mp4', 'https://b.com/1.mp4'])
+    mirror = mirrors.choose()
+    with mirror:
+        ...  # download from mirror.url
+    mirrors.record(mirror, size=1024, elapsed=0.5)  # or mirrors.fail(mirror)
+"""
+from typing import List
+from urllib.parse import urlparse
+import time
+
+
+class Mirror(object):
+    """an url of media and its statistics."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.host = urlparse(url).hostname
+
+        self.speed = None  # bytes per second of a single connection
+        self.active = 0  # connections opened to this mirror
+        self.failures = 0  # continuous failures
+        self.available_at = 0  # avoid this mirror before this time
+
+    @property
+    def score(self) -> float:
+        """expected throughput of a new connection, untested mirrors first."""
+        if self.speed is None:
+            return float('inf')
+        return self.speed / (self.active + 1)
+
+    def __enter__(self):
+        self.active += 1
+        return self
+
+    def __exit__(self, *args):
+        self.active -= 1
+
+
+class MirrorPool(object):
+    """a group of equivalent urls."""
+    max_cooldown = 60  # seconds
+
+    def __init__(self, urls: List[str]):
+        """Initialize a mirror pool.
+
+        Args:
+            urls: equivalent urls, duplicated ones will be dropped.
+        """
+        self.mirrors = [Mirror(url) for url in dict.fromkeys(urls) if url]
+
+    def choose(self) -> Mirror:
+        """return the mirror which is most likely to be the fastest."""
+        now = time.monotonic()
+        candidates = [item for item in self.mirrors if item.available_at <= now]
+        if not candidates:  # all failed recently, try the one recovers first
+            return min(self.mirrors, key=lambda item: item.available_at)
+        return max(candidates, key=lambda item: item.score)
+
+    def record(self, mirror: Mirror, size: int, elapsed: float) -> None:
+        """update mirror's speed after size bytes received in elapsed seconds.
+        """
+        mirror.failures = 0
+        if size == 0 or elapsed <= 0:
+            return
+
+        speed = size / elapsed
+        if mirror.speed is None:
+            mirror.speed = speed
+        else:  # smooth it
+            mirror.speed = 0.5 * speed + 0.5 * mirror.speed
+
+    def fail(self, mirror: Mirror) -> None:
+        """avoid a failed mirror for a while, longer if it fails again."""
+        mirror.failures += 1
+        cooldown = min(2 ** mirror.failures, self.max_cooldown)
+        mirror.available_at = time.monotonic() + cooldown
+        if mirror.speed is not None:
+            mirror.speed /= 2
@@ -0,0 +1,203 @@
+"""Report downloading progress of all medias at a fixed rate.
+
+Medias only add received bytes to their own counter, a background task reads
+these counters periodically, calculates speed and ETA, and then draws a status
+line on console or emits json lines for other programs.
+
+Typical usage:
+    progress = Progress(mode='json', interval=0.5)
+    item = progress.register('video.mp4', total=1024, group='video')
+    item.advance(512)
+    item.finish()
+"""
+from typing import Optional
+import asyncio
+import json
+import sys
+import time
+
+from video_dl.toolbox import ConsoleColor
+
+
+def _format_size(size: float) -> str:
+    """return size in MB."""
+    return f'{size / 1024 / 1024:.2f}MB'
+
+
+def _format_eta(seconds: Optional[float]) -> str:
+    """return seconds like 1:02:03."""
+    if seconds is None:
+        return '--:--'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f'{hours}:{minutes:02d}:{seconds:02d}'
+    return f'{minutes:02d}:{seconds:02d}'
+
+
+class ProgressItem(object):
+    """downloading progress of a media."""
+
+    def __init__(self, name: str, total: int, group: Optional[str] = None,
+                 completed: Optional[int] = 0):
+        """Initialize a progress item.
+
+        Args:
+            name: media's name.
+            total: media's size in bytes.
+            group: which video this media belongs to.
+            completed: bytes already on disk before downloading.
+        """
+        self.name = name
+        self.group = group
+        self.total = total
+        self.completed = completed
+
+        self.speed = None  # bytes per second
+        self.failed = False
+        self.finished = False
+
+        self._start_time = time.monotonic()
+        self._start_completed = completed
+        self._last_completed = completed
+
+    def advance(self, size: int) -> None:
+        """add received bytes."""
+        self.completed += size
+
+    def finish(self, failed: Optional[bool] = False) -> None:
+        """mark this media as finished."""
+        self.failed = failed
+        self.finished = True
+
+    def measure(self, elapsed: float) -> None:
+        """update speed with bytes received in elapsed seconds."""
+        speed = (self.completed - self._last_completed) / elapsed
+        self._last_completed = self.completed
+        if self.speed is None:
+            self.speed = speed
+        else:  # smooth it
+            self.speed = 0.3 * speed + 0.7 * self.speed
+
+    @property
+    def eta(self) -> Optional[float]:
+        """return seconds needed to finish, None means unknown."""
+        if not self.speed:
+            return None
+        return max(self.total - self.completed, 0) / self.speed
+
+    @property
+    def average_speed(self) -> float:
+        """return average speed since registered."""
+        elapsed = max(time.monotonic() - self._start_time, 1e-6)
+        return (self.completed - self._start_completed) / elapsed
+
+    def to_dict(self) -> dict:
+        """return a dictionary used by json mode."""
+        return {
+            'name': self.name,
+            'video': self.group,
+            'completed': self.completed,
+            'total': self.total,
+            'speed': round(self.speed or 0),
+            'eta': None if self.eta is None else round(self.eta, 1),
+        }
+
+
+class Progress(object):
+    """collect progress items and report them periodically."""
+    modes = ('bar', 'json')
+
+    def __init__(self, mode: Optional[str] = 'bar',
+                 interval: Optional[float] = 0.5):
+        """Initialize a progress reporter.
+
+        Args:
+            mode: 'bar' draws a status line, 'json' emits json lines.
+            interval: seconds between two reports.
+        """
+        if mode not in self.modes:
+            raise ValueError(f'progress should be one of {self.modes}, '
+                             f'got {mode!r}')
+        self.mode = mode
+        self.interval = interval
+
+        self.items = []
+        self._task = None
+
+    def register(self, name: str, total: int, *,
+                 group: Optional[str] = None,
+                 completed: Optional[int] = 0) -> ProgressItem:
+        """add a media to report, start reporting if necessary."""
+        item = ProgressItem(name, total, group, completed)
+        self.items.append(item)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._report_forever())
+        return item
+
+    async def close(self) -> None:
+        """wait until the last report is done."""
+        if self._task is not None:
+            await self._task
+
+    async def _report_forever(self) -> None:
+        """report progress until all items are finished."""
+        last_time = time.monotonic()
+        while self.items:
+            await asyncio.sleep(self.interval)
+
+            now = time.monotonic()
+            for item in self.items:
+                item.measure(max(now - last_time, 1e-6))
+            last_time = now
+
+            self.report()
+
+    def report(self) -> None:
+        """report all items once, and forget finished ones."""
+        finished = [item for item in self.items if item.finished]
+        self.items = [item for item in self.items if not item.finished]
+
+        if self.mode == 'json':
+            for item in finished:
+                self._emit('failed' if item.failed else 'finished', item)
+            for item in self.items:
+                self._emit('progress', item)
+            sys.stdout.flush()
+        else:
+            for item in finished:
+                self._draw_finished(item)
+            if self.items:
+                self._draw_status()
+
+    def _emit(self, event: str, item: ProgressItem) -> None:
+        """write a json line."""
+        print(json.dumps({'event': event, **item.to_dict()},
+                         ensure_ascii=False))
+
+    def _draw_finished(self, item: ProgressItem) -> None:
+        """draw a permanent line for a finished item."""
+        label = 'failed' if item.failed else 'downloaded'
+        print('\r\033[K', ConsoleColor.WARNING, f'[{label}] ',
+              ConsoleColor.OKGREEN,
+              f'{_format_size(item.completed)}/{_format_size(item.total)} ',
+              f'@ {_format_size(item.average_speed)}/s ',
+              ConsoleColor.OKCYAN, item.name, ConsoleColor.ENDC, sep='')
+
+    def _draw_status(self) -> None:
+        """draw a status line for all downloading items."""
+        completed = sum(item.completed for item in self.items)
+        total = max(sum(item.total for item in self.items), 1)
+        speed = sum(item.speed or 0 for item in self.items)
+        eta = max(total - completed, 0) / speed if speed else None
+        progress = int(completed / total * 20)
+
+        print('\r\033[K', ConsoleColor.WARNING, '[downloading] ',
+              ConsoleColor.OKGREEN,
+              f'[{completed / total * 100:3.0f}%]',
+              f'({_format_size(completed)}/{_format_size(total)})|',
+              'x' * progress, '.' * (20 - progress), '| ',
+              f'{_format_size(speed)}/s ETA {_format_eta(eta)} ',
+              ConsoleColor.OKCYAN, f'{len(self.items)} media(s)',
+              ConsoleColor.ENDC, sep='', end='', flush=True)
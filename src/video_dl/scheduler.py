@@ -0,0 +1,98 @@
+"""Hand out byte ranges of a media to concurrent connections.
+
+Ranges are cut from the front of the pending bytes. The first ones are small,
+so that every connection starts working quickly, and the following ones grow
+until they reach a upper limit. When nothing is pending any more, an idle
+connection steals the second half of the range which has the most bytes left.
+
+Typical usage:
+    scheduler = RangeScheduler([(0, 1024)], min_chunk=128, max_chunk=512)
+    while (item := scheduler.next()) is not None:
+        ...  # download item.position ~ item.stop, item.stop may shrink
+        scheduler.finish(item)
+"""
+from typing import List, Optional, Tuple
+
+
+class Range(object):
+    """a byte range which is being downloaded by a connection.
+
+    Attributes:
+        start: first byte of this range.
+        position: next byte should be received.
+        stop: the byte after the last one, may be reduced by a thief.
+    """
+
+    def __init__(self, start: int, stop: int):
+        self.start = start
+        self.position = start
+        self.stop = stop
+
+    @property
+    def remaining(self) -> int:
+        """return count of bytes haven't been received."""
+        return max(self.stop - self.position, 0)
+
+    def __repr__(self):
+        return f'Range({self.start}, {self.position}, {self.stop})'
+
+
+class RangeScheduler(object):
+    """split pending bytes into ranges and hand them out on demand."""
+
+    def __init__(self, ranges: List[Tuple[int, int]], *,
+                 min_chunk: int, max_chunk: int):
+        """Initialize a scheduler.
+
+        Args:
+            ranges: half-open byte ranges need to be downloaded.
+            min_chunk: size of the first range, also the smallest range which
+                could be stolen.
+            max_chunk: ranges will never be bigger than this.
+        """
+        self.pending = [list(item) for item in ranges if item[0] < item[1]]
+        self.active = []
+
+        self.min_chunk = max(min(min_chunk, max_chunk), 1)
+        self.max_chunk = max_chunk
+        self._chunk = self.min_chunk
+
+    def next(self) -> Optional[Range]:
+        """return a range for an idle connection, None means nothing to do."""
+        if self.pending:
+            start, stop = self.pending[0]
+            stop = min(stop, start + self._chunk)
+            if stop == self.pending[0][1]:
+                self.pending.pop(0)
+            else:
+                self.pending[0][0] = stop
+
+            self._chunk = min(self._chunk * 2, self.max_chunk)
+            item = Range(start, stop)
+        else:
+            item = self._steal()
+
+        if item is not None:
+            self.active.append(item)
+        return item
+
+    def _steal(self) -> Optional[Range]:
+        """split the range which lags behind most, return its second half."""
+        if not self.active:
+            return None
+
+        victim = max(self.active, key=lambda item: item.remaining)
+        if victim.remaining < 2 * self.min_chunk:
+            return None  # not worth a new request
+
+        middle = victim.position + victim.remaining // 2
+        item = Range(middle, victim.stop)
+        victim.stop = middle
+        return item
+
+    def finish(self, item: Range) -> None:
+        """take back a range, unreceived bytes will be handed out again."""
+        self.active.remove(item)
+        if item.position < item.stop:
+            self.pending.append([item.position, item.stop])
+            self.pending.sort()
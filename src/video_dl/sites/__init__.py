@@ -1,7 +1,100 @@
-from .bilibili import (BilibiliVideoExtractor,
-                       BilibiliBangumiExtractor,
-                       BilibiliSpider)
-from .pornhub import PornhubSpider, PornhubExtractor
-from .ixigua import IXiGuaSpider, IXiGuaExtractor
-from .xvideos import XVideosSpider, XVideosExtractor
-from .qq import QQSpider
\ No newline at end of file
+"""Registry of supported sites, a site is imported only when it's used.
+
+Sites are indexed by host name, a url's host and its parent domains are looked
+up in order (e.g.: www.bilibili.com, bilibili.com, com), so that finding the
+site of a url costs several dict lookups only.
+
+Third-party sites could be registered through entry points in group
+`video_dl.sites`, whose name is host name and value is the module, e.g.:
+    [options.entry_points]
+    video_dl.sites =
+        example.com = video_dl_example.sites.example
+
+Typical usage:
+    from video_dl.sites import load
+    load('https://www.bilibili.com/video/BV15L411p7M8')  # import bilibili
+"""
+from typing import Iterator, Optional
+from urllib.parse import urlparse
+import importlib
+import importlib.metadata
+
+
+# host name -> module of the site
+registry = {
+    'bilibili.com': 'video_dl.sites.bilibili',
+    'ixigua.com': 'video_dl.sites.ixigua',
+    'pornhub.com': 'video_dl.sites.pornhub',
+    'v.qq.com': 'video_dl.sites.qq',
+    'xvideos.com': 'video_dl.sites.xvideos',
+}
+
+# names used to be imported from this package -> module of the site
+_names = {
+    'BilibiliVideoExtractor': 'video_dl.sites.bilibili',
+    'BilibiliBangumiExtractor': 'video_dl.sites.bilibili',
+    'BilibiliSpider': 'video_dl.sites.bilibili',
+    'PornhubSpider': 'video_dl.sites.pornhub',
+    'PornhubExtractor': 'video_dl.sites.pornhub',
+    'IXiGuaSpider': 'video_dl.sites.ixigua',
+    'IXiGuaExtractor': 'video_dl.sites.ixigua',
+    'XVideosSpider': 'video_dl.sites.xvideos',
+    'XVideosExtractor': 'video_dl.sites.xvideos',
+    'QQSpider': 'video_dl.sites.qq',
+}
+
+_plugins_loaded = False
+
+
+def host_suffixes(url: str) -> Iterator[str]:
+    """yield host of url and its parent domains, the longest first."""
+    labels = (urlparse(url).hostname or '').split('.')
+    for index in range(len(labels)):
+        yield '.'.join(labels[index:])
+
+
+def _load_plugins() -> None:
+    """add sites registered by entry points to registry, only once."""
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+
+    entry_points = importlib.metadata.entry_points()
+    if hasattr(entry_points, 'select'):
+        group = entry_points.select(group='video_dl.sites')
+    else:  # python < 3.10
+        group = entry_points.get('video_dl.sites', [])
+    for entry_point in group:
+        registry.setdefault(entry_point.name, entry_point.value)
+
+
+def _find(url: str) -> Optional[str]:
+    """return host name of the site of url in registry."""
+    for host in host_suffixes(url):
+        if host in registry:
+            return host
+    return None
+
+
+def load(url: str) -> Optional[str]:
+    """import the site of url.
+
+    Returns:
+        host name of the site, None if the site is not supported.
+    """
+    # entry points are scanned for an unknown url only
+    if (host := _find(url)) is None and not _plugins_loaded:
+        _load_plugins()
+        host = _find(url)
+
+    if host is not None:
+        importlib.import_module(registry[host])
+    return host
+
+
+def __getattr__(name: str):
+    """import a spider or an extractor lazily, e.g.: sites.BilibiliSpider."""
+    if name not in _names:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    return getattr(importlib.import_module(_names[name]), name)
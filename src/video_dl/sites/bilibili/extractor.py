@@ -1,26 +1,70 @@
-"""extract information from html source code of bilibili.com."""
+"""extract information from html source code of bilibili.com.
+
+html source code is parsed into a BilibiliPage once, state and playinfo in it
+are decoded at most once, all accessors of extractors read from the page.
+
+Typical usage:
+    extractor = Extractor.create(url)
+    page = extractor.parse(resp)
+    title = extractor.get_title(page)
+"""
+from array import array
+from functools import cached_property
+from typing import Optional
 from urllib.parse import urljoin
 import json
 import re
 
-from google.protobuf.json_format import MessageToJson
-
 from video_dl.sites.bilibili.dm_pb2 import DmSegMobileReply
 from video_dl.extractor import Extractor
 
 
+class BilibiliPage(object):
+    """html source code of a bilibili page, decoded lazily and only once."""
+
+    # re patterns to extract information from html source code
+    re_state = re.compile(r'__INITIAL_STATE__=(.*?);\(function\(\)')
+    re_playinfo = re.compile(r'window.__playinfo__=(.*?)</script>')
+
+    def __init__(self, resp: str):
+        self.resp = resp
+
+    @cached_property
+    def state(self) -> dict:
+        """window.__INITIAL_STATE__, information about video and playlist."""
+        return json.loads(self.re_state.search(self.resp).group(1))
+
+    @cached_property
+    def playinfo(self) -> dict:
+        """window.__playinfo__, information about medias."""
+        return json.loads(self.re_playinfo.search(self.resp).group(1))
+
+    @cached_property
+    def duration(self) -> int:
+        """duration (seconds) of medias, 1 if unknown."""
+        return self.playinfo['data']['dash'].get('duration') or 1
+
+    @cached_property
+    def id2desc(self) -> dict:
+        """quality id -> quality description."""
+        desc = self.playinfo['data']['accept_description']
+        quality = self.playinfo['data']['accept_quality']
+        return {str(key): value for key, value in zip(quality, desc)}
+
+
 class BilibiliVideoExtractor(Extractor):
     """bilibili information extractor."""
     pattern = [
         re.compile('bilibili.com/video/BV.*'),
     ]
+    markers = [
+        ('__INITIAL_STATE__=', ';(function()'),  # BilibiliPage.re_state
+        ('__playinfo__=', '</script>'),  # BilibiliPage.re_playinfo
+    ]
 
-    # re patterns to extract information from html source code
-    re_state = re.compile(r'__INITIAL_STATE__=(.*?);\(function\(\)')
-    re_playinfo = re.compile(r'window.__playinfo__=(.*?)</script>')
-
-    def __init__(self):
-        self.id2desc = None
+    def parse(self, resp: str) -> BilibiliPage:
+        """return a page object which should be passed to accessors."""
+        return BilibiliPage(resp)
 
     def jsonsub_to_asssub(self, title: str, sub_list: list) -> str:
         """json substitle to ass substitle."""
@@ -29,9 +73,9 @@ class BilibiliVideoExtractor(Extractor):
         except Exception:  # pylint: disable=W0703
             return ''
 
-    def get_title(self, resp: str) -> str:
+    def get_title(self, page: BilibiliPage) -> str:
         """get video's title from html source code."""
-        state = json.loads(self.re_state.search(resp).group(1))
+        state = page.state
 
         current_page = state['p']
         pages = state['videoData']['pages']
@@ -39,13 +83,13 @@ class BilibiliVideoExtractor(Extractor):
         if len(pages) == 1:
             return state['videoData']['title']
 
-        for page in pages:
-            if page['page'] == current_page:
-                return page['part']
+        for part in pages:
+            if part['page'] == current_page:
+                return part['part']
 
-    def get_parent_folder(self, resp: str) -> str:
+    def get_parent_folder(self, page: BilibiliPage) -> str:
         """get video's parent folder from html source code."""
-        state = json.loads(self.re_state.search(resp).group(1))
+        state = page.state
 
         pages = state['videoData']['pages']
         if len(pages) > 1:
@@ -53,66 +97,78 @@ class BilibiliVideoExtractor(Extractor):
         else:
             return None  # just one video doesn't need to create parent folder
 
-    def get_pictures(self, resp: str) -> list:
+    def get_pictures(self, page: BilibiliPage) -> list:
         """get pictures' information from html source code."""
-        playinfo = json.loads(self.re_playinfo.search(resp).group(1))
-
-        if self.id2desc is None:
-            desc = playinfo['data']['accept_description']
-            quality = playinfo['data']['accept_quality']
-            self.id2desc = {
-                str(key): value for key, value in zip(quality, desc)
-            }
-
-        pictures = playinfo['data']['dash']['video']
+        pictures = page.playinfo['data']['dash']['video']
         for media in pictures:
             yield {
                 'url': media['base_url'],
-                'size': media['bandwidth'],
-                'desc': f"{self.id2desc[str(media['id'])]} + {media['codecs']}"
+                'backup_urls': media.get('backup_url') or [],
+                'size': media['bandwidth'] * page.duration // 8,
+                'desc': f"{page.id2desc[str(media['id'])]} + {media['codecs']}"
             }
 
-    def get_sounds(self, resp: str) -> list:
+    def get_sounds(self, page: BilibiliPage) -> list:
         """get sounds' information from html source code."""
-        playinfo = json.loads(self.re_playinfo.search(resp).group(1))
-
-        if self.id2desc is None:
-            desc = playinfo['data']['accept_description']
-            quality = playinfo['data']['accept_quality']
-            self.id2desc = {
-                str(key): value for key, value in zip(quality, desc)
-            }
-
-        sounds = playinfo['data']['dash']['audio']
+        sounds = page.playinfo['data']['dash']['audio']
         for media in sounds:
             yield {
                 'url': media['base_url'],
-                'size': media['bandwidth'],
+                'backup_urls': media.get('backup_url') or [],
+                'size': media['bandwidth'] * page.duration // 8,
             }
 
-    def generate_urls(self, resp: str, base_url: str) -> list:
+    def generate_urls(self, page: BilibiliPage, base_url: str) -> list:
         """generate urls from html resource code."""
-        state = json.loads(self.re_state.search(resp).group(1))
+        state = page.state
 
         current_page = state['p']
         pages = state['videoData']['pages']
-        for page in pages:
-            if (index := page['page']) != current_page:
+        for part in pages:
+            if (index := part['page']) != current_page:
                 yield urljoin(base_url, f'?p={index}')
 
-    def get_oid_pid(self, resp: str, base_url: str = None) -> tuple:
+    def get_oid_pid(self, page: BilibiliPage, base_url: str = None) -> tuple:
         """get oid and pid from html source code."""
         del base_url
-        state = json.loads(self.re_state.search(resp).group(1))
+        state = page.state
         oid = state['videoData']['cid']
         pid = state['aid']
         return oid, pid
 
-    def get_dm(self, bytes_stream: str) -> dict:
-        """generate json dictionary from binary stream."""
+    def get_duration(self, page: BilibiliPage,
+                     base_url: str = None) -> Optional[float]:
+        """get video's duration in seconds, None if unknown."""
+        del base_url
+        state = page.state
+        for part in state['videoData']['pages']:
+            if part['page'] == state['p']:
+                return part.get('duration')
+        return state['videoData'].get('duration')
+
+    def get_index(self, page: BilibiliPage, base_url: str = None) -> int:
+        """get video's position in playlist."""
+        del base_url
+        return page.state['p']
+
+    def get_dm(self, bytes_stream: bytes) -> dict:
+        """decode a danmaku segment into columns.
+
+        Returns:
+            a dictionary of columns, the i-th danmaku is made up of the i-th
+            item of every column: progress (ms), mode, fontsize, color and
+            content.
+        """
         dm = DmSegMobileReply()
         dm.ParseFromString(bytes_stream)
-        return json.loads(MessageToJson(dm))['elems']
+        elems = dm.elems
+        return {
+            'progress': array('i', [elem.progress for elem in elems]),
+            'mode': array('i', [elem.mode for elem in elems]),
+            'fontsize': array('i', [elem.fontsize for elem in elems]),
+            'color': array('I', [elem.color for elem in elems]),
+            'content': [elem.content for elem in elems],
+        }
 
 
 class BilibiliBangumiExtractor(BilibiliVideoExtractor, Extractor):
@@ -122,33 +178,42 @@ class BilibiliBangumiExtractor(BilibiliVideoExtractor, Extractor):
         re.compile('bilibili.com/bangumi/play/ss.*'),
     ]
 
-    def get_title(self, resp: str) -> str:
+    def get_title(self, page: BilibiliPage) -> str:
         """get video's title from html source code."""
-        state = json.loads(self.re_state.search(resp).group(1))
-        return state['h1Title']
+        return page.state['h1Title']
 
-    def get_parent_folder(self, resp: str) -> str:
+    def get_parent_folder(self, page: BilibiliPage) -> str:
         """get video's parent folder from html source code."""
-        state = json.loads(self.re_state.search(resp).group(1))
-        return state['mediaInfo']['season_title']
+        return page.state['mediaInfo']['season_title']
 
-    def generate_urls(self, resp: str, base_url: str) -> list:
+    def generate_urls(self, page: BilibiliPage, base_url: str) -> list:
         """generate urls from html resource code."""
-        state = json.loads(self.re_state.search(resp).group(1))
-
-        pages = state['mediaInfo']['episodes']
-        for page in pages:
-            url = page['link'].replace('/u002f', '/')
+        for episode in page.state['mediaInfo']['episodes']:
+            url = episode['link'].replace('/u002f', '/')
             if url not in base_url:
                 yield url
 
-    def get_oid_pid(self, resp: str, base_url: str) -> tuple:
+    def get_oid_pid(self, page: BilibiliPage, base_url: str) -> tuple:
         """get oid and pid from html source code."""
-        state = json.loads(self.re_state.search(resp).group(1))
-        pages = state['mediaInfo']['episodes']
-        for page in pages:
-            url = page['link'].replace('/u002f', '/')
+        for episode in page.state['mediaInfo']['episodes']:
+            url = episode['link'].replace('/u002f', '/')
             if url in base_url:
-                oid = page['cid']
-                pid = page['aid']
-                return oid, pid
+                return episode['cid'], episode['aid']
+
+    def get_duration(self, page: BilibiliPage,
+                     base_url: str = None) -> Optional[float]:
+        """get episode's duration in seconds, None if unknown."""
+        for episode in page.state['mediaInfo']['episodes']:
+            url = episode['link'].replace('/u002f', '/')
+            if url in base_url and episode.get('duration'):
+                return episode['duration'] / 1000  # in ms
+        return None
+
+    def get_index(self, page: BilibiliPage,
+                  base_url: str = None) -> Optional[int]:
+        """get episode's position in season."""
+        episodes = page.state['mediaInfo']['episodes']
+        for index, episode in enumerate(episodes, 1):
+            if episode['link'].replace('/u002f', '/') in base_url:
+                return index
+        return None
@@ -1,57 +1,81 @@
-"""convert json subtitles to ass subtitles."""
+"""convert danmaku columns (see BilibiliVideoExtractor.get_dm) to ass subtitles.
+"""
+from typing import Optional, TextIO
+
 from video_dl.danmaku import Danmaku
 
 
 class Convertor(object):
-    """convert json to ass."""
-    def __init__(self, file_path: str = None):
-        self.danmaku = Danmaku(file_path)
+    """convert danmaku columns to ass."""
+    def __init__(self, file_path: str = None,
+                 output: Optional[TextIO] = None):
+        self.danmaku = Danmaku(file_path, output)
         self.screen_width = 560  # width of screen
         self.screen_height = 420  # height of screen
         self.move_time = 8  # duration time of move subtitle
         self.fixed_time = 4  # duration time of fixed subtitle
+        self.font_size = 14  # font size in ass header
+        self.default_font_size = 25  # font size of a normal danmaku
 
-        self.result = []
+        # danmaku's mode -> (how to display it, duration time in ms)
+        self.modes = {
+            **dict.fromkeys((1, 2, 3, 7, 8, 9),
+                            ('normal', self.move_time * 1000)),
+            6: ('reverse', self.move_time * 1000),
+            4: ('bottom', self.fixed_time * 1000),
+            5: ('top', self.fixed_time * 1000),
+        }
 
     def edit_header(self, title: str) -> None:
         self.danmaku.edit_header(title)
 
     def ms2datetime(self, ms: int) -> str:
-        """convert ms to datetime."""
-        hour = int(ms/(1000*60*60))
-        minute = int(ms/(1000*60)) % 60
-        second = int(ms/1000) % 60
-        ms = ms % 1000
-
-        return f'{hour}:{minute}:{second}.{ms}'
-
-    def json2ass(self, json_data: dict) -> None:
-        text = json_data['content']
-
-        if json_data['mode'] in (1, 2, 3, 7, 8, 9):
-            duration = self.move_time * 1000
-            mode = 'normal'
-        elif json_data['mode'] == 6:
-            duration = self.move_time * 1000
-            mode = 'reverse'
-        elif json_data['mode'] == 4:  # bottom
-            duration = self.fixed_time * 1000
-            mode = 'bottom'
-        elif json_data['mode'] == 5:  # top
-            duration = self.fixed_time * 1000
-            mode = 'top'
-
-        start = self.ms2datetime(json_data['progress'])
-        end = self.ms2datetime(json_data['progress'] + duration)
-        color = r'\c&H' + str(hex(json_data['color']))[-6:] + '&'
-
-        self.danmaku.add_dialog(self.danmaku.generate_dialog(**{
-            'start': start,
-            'end': end,
-            'mode': mode,
-            'content': text,
-            'color': color,
-        }))
+        """convert ms to datetime like 1:02:03.45."""
+        return (f'{ms // 3600000}:{ms // 60000 % 60:02d}:'
+                f'{ms // 1000 % 60:02d}.{ms // 10 % 100:02d}')
+
+    def columns2ass(self, columns: dict) -> None:
+        """convert all danmaku in columns to dialogues.
+
+        columns should be later than the previous ones (e.g.: segments of
+        danmaku in order), so that danmaku could be placed in time order.
+        danmaku with unknown mode will be dropped, so are those can't find a
+        place if `danmaku_drop` is set.
+        """
+        # sort danmaku by start time
+        progresses = columns['progress']
+        order = sorted(range(len(progresses)), key=progresses.__getitem__)
+
+        ms2datetime = self.ms2datetime
+        modes = [self.modes.get(mode) for mode in columns['mode']]
+        starts = [ms2datetime(progress) for progress in progresses]
+        ends = [ms2datetime(progress + mode[1]) if mode else None
+                for progress, mode in zip(progresses, modes)]
+
+        font_sizes = {}  # danmaku's font size -> ass code
+        for index in order:
+            mode, content = modes[index], columns['content'][index]
+            if mode is None:
+                continue
+
+            lane = self.danmaku.place(mode[0], start=progresses[index],
+                                      duration=mode[1], content=content)
+            if lane is None and self.danmaku.drop_crowded:
+                continue
+
+            fontsize = columns['fontsize'][index]
+            if fontsize not in font_sizes:
+                font_sizes[fontsize] = (
+                    '' if fontsize in (0, self.default_font_size) else
+                    rf'\fs{round(self.font_size * fontsize / self.default_font_size)}'
+                )
+
+            self.danmaku.add_dialog(self.danmaku.generate_dialog(
+                start=starts[index], end=ends[index], mode=mode[0],
+                content=content, fontsize=font_sizes[fontsize],
+                color=rf'\c&H{columns["color"][index] & 0xFFFFFF:06x}&',
+                lane=lane,
+            ))
 
     def output(self) -> str:
         return self.danmaku.output_subtitle()
@@ -1,11 +1,18 @@
 """Spider for bilibili.com"""
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
 import asyncio
+import collections
+import math
+import os
 import re
 
+from video_dl.args import Setting
 from video_dl.spider import Spider
 from video_dl.toolbox import info
 from video_dl.video import Video, Media
 from video_dl.extractor import Extractor
+from video_dl.sites.bilibili.extractor import BilibiliPage
 from video_dl.sites.bilibili.json2ass import Convertor
 
 
@@ -14,40 +21,98 @@ class BilibiliSpider(Spider):
     site = 'bilibili.com'
     home_url = 'https://www.bilibili.com'
 
+    crawl_workers = Setting('crawl_workers')
+    crawl_max_depth = Setting('crawl_max_depth')
+    crawl_max_items = Setting('crawl_max_items')
+
     pattern = [
         re.compile('bilibili.com/bangumi/play/ep.*'),
         re.compile('bilibili.com/video/BV.*'),
     ]
 
-    def __init__(self):
-        super().__init__()
+    # ids used by archive
+    re_bvid = re.compile(r'/video/(BV\w+)')
+    re_epid = re.compile(r'/bangumi/play/ep(\d+)')
+
+    def __init__(self, url: str):
+        super().__init__(url)
 
         self.dm_url = 'https://api.bilibili.com/x/v2/dm/web/seg.so'
+        self.dm_segment_length = 360  # seconds of danmaku in a segment
+        self.dm_max_conn = 4  # segments fetched simultaneously per video
 
         self.list_video_already_flag = False
 
         self.extractor = None
 
+        # pages have been (or will be) crawled, keyed by archive id
+        self.visited = set()
+        self.page_slots = None  # created in event loop, see before_download
+
     async def before_download(self) -> None:
+        # spider may be created before event loop (python < 3.10 binds
+        # semaphore to the loop at creation)
+        self.page_slots = asyncio.Semaphore(self.crawl_workers)
         await self.parse_html(self.url)
 
-    async def after_downloaded(self) -> None:
-        for video in self.video_list:
-            # download danmaku of each video
-            await self.get_dm(video)
-
-            # merge picture and sound to a complete video
-            video.merge()
-
-    async def parse_html(self, target_url: str) -> None:
+    async def after_video_downloaded(self, video: Video) -> None:
+        """download danmaku and merge picture and sound of a video."""
+        await self.get_dm(video)
+        if await video.merge():
+            self.archive_video(video)
+
+    def archive_id(self, url: str) -> Optional[str]:
+        """BV15L411p7M8_p2 for a part of a video, ep123456 for an episode."""
+        if match := self.re_epid.search(url):
+            return f'ep{match.group(1)}'
+        if match := self.re_bvid.search(url):
+            page = parse_qs(urlparse(url).query).get('p', ['1'])[0]
+            return f'{match.group(1)}_p{page}'
+        return None
+
+    def visit(self, url: str) -> bool:
+        """mark url as visited.
+
+        Returns:
+            False if url has been visited, or too many pages are visited.
+        """
+        key = self.archive_id(url) or url
+        if key in self.visited:
+            return False
+        if self.crawl_max_items and len(self.visited) >= self.crawl_max_items:
+            info('skip', f'{url}, already crawled {len(self.visited)} pages')
+            return False
+        self.visited.add(key)
+        return True
+
+    async def parse_html(self, target_url: str, depth: int = 0) -> None:
         """extract key information from html source code.
 
         Args:
-            target_url: target url copied from online vide website.
+            target_url: target url copied from online vide website, should
+                have been marked as visited if it's found in a playlist.
+            depth: how many pages are crawled to find this url.
         """
+        if depth == 0 and not self.visit(target_url):
+            return
+        if depth > self.crawl_max_depth:
+            info('skip', f'{target_url} is too deep')
+            return
         info('url', target_url)
-        resp, target_url = await self.fetch_html(target_url)
+
+        # a known video needn't be fetched again, unless its page is the
+        # only way to find a playlist
+        find_list = self.lists and not self.list_video_already_flag
+        if not find_list and self.is_archived(target_url):
+            info('skip', f'{target_url} is in archive')
+            return
+
+        async with self.page_slots:
+            resp, target_url = await self.fetch_html(
+                target_url, markers=Extractor.get_markers(target_url))
+        self.visited.add(self.archive_id(target_url) or target_url)
         self.extractor = Extractor.create(target_url)
+        page = self.extractor.parse(resp)
 
         # should we extract video information in this target_url
         extract_flag = False
@@ -57,18 +122,26 @@ class BilibiliSpider(Spider):
                 break
 
         if extract_flag is False:
-            urls = self.extractor.generate_urls(resp, self.url)
-            await self.parse_html(next(urls))
+            url = next(self.extractor.generate_urls(page, self.url), None)
+            if url is None:
+                info('failed', f'found no video in {target_url}')
+            elif self.visit(url):
+                await self.parse_html(url, depth + 1)
+            return
+
+        if self.is_archived(target_url):
+            info('skip', f'{target_url} is in archive')
+            await self.parse_playlist(page, depth)
             return
 
         video = self.create_video()
-        video.title = self.extractor.get_title(resp)
+        video.title = self.extractor.get_title(page)
 
         if self.lists:
-            video.parent_folder = self.extractor.get_parent_folder(resp)
+            video.parent_folder = self.extractor.get_parent_folder(page)
 
         try:
-            for picture in self.extractor.get_pictures(resp):
+            for picture in self.extractor.get_pictures(page):
                 video.add_media(Media(**picture), target='picture')
         except Exception:  # pylint: disable=W0703
             info(
@@ -78,22 +151,33 @@ class BilibiliSpider(Spider):
             )
             return
 
-        for sound in self.extractor.get_sounds(resp):
+        for sound in self.extractor.get_sounds(page):
             video.add_media(Media(**sound), target='sound')
 
         # ready to download dabmaku
-        oid, pid = self.extractor.get_oid_pid(resp, target_url)
+        oid, pid = self.extractor.get_oid_pid(page, target_url)
         video.meta_data['oid'] = oid
         video.meta_data['pid'] = pid
+        video.meta_data['duration'] = self.extractor.get_duration(
+            page, target_url)
+        video.index = self.extractor.get_index(page, target_url)
+        video.meta_data['archive_id'] = self.archive_id(target_url)
 
         self.video_list.append(video)
+        await self.parse_playlist(page, depth)
+
+    async def parse_playlist(self, page: BilibiliPage, depth: int) -> None:
+        """tring to get a playlist contains this video.
 
-        # tring to get a playlist contains this video
+        every video in playlist is crawled once, pages fetched at the same
+        time are limited by `crawl_workers`.
+        """
         if self.lists and not self.list_video_already_flag:
             info('list', 'tring to fetch more videos...')
             self.list_video_already_flag = True
-            tasks = [self.parse_html(url)
-                     for url in self.extractor.generate_urls(resp, self.url)]
+            tasks = [self.parse_html(url, depth + 1)
+                     for url in self.extractor.generate_urls(page, self.url)
+                     if self.visit(url)]
 
             if tasks:
                 info('list', f'fetched {len(tasks)} more video(s)...')
@@ -102,32 +186,61 @@ class BilibiliSpider(Spider):
                 info('list', 'fetched nothing!')
 
     async def get_dm(self, video: Video) -> None:
-        """fetch video's danmaku."""
-        danmaku_list = []
+        """fetch video's danmaku, and write them to an ass file.
+
+        segments expected by video's duration are fetched in a sliding
+        window of `dm_max_conn` segments, and then the following ones one by
+        one until an empty segment, in case that the duration is inaccurate.
+
+        segments are partitioned by time, so they are converted and written
+        one by one in order, at most `dm_max_conn` segments are held in
+        memory.
+        """
         params = {
             'oid': video.meta_data['oid'],
             'pid': video.meta_data['pid'],
             'type': 1,
         }
 
-        page_index = 1
-        while True:
-            params.update({'segment_index': page_index})
-            page_index += 1
+        async def fetch_segment(index: int) -> bytes:
+            return await self.fetch_content(url=self.dm_url, params={
+                **params, 'segment_index': index,
+            })
 
-            content = await self.fetch_content(url=self.dm_url, params=params)
+        duration = video.meta_data.get('duration')
+        count = math.ceil(duration / self.dm_segment_length) if duration else 1
+        count = max(count, 1)
 
-            if content:
-                danmaku_list += self.extractor.get_dm(content)
-            else:
-                break
+        tasks = collections.deque()  # segments being fetched, in order
+        index = 0  # the last segment being fetched
+        while index < min(count, self.dm_max_conn):
+            index += 1
+            tasks.append(asyncio.create_task(fetch_segment(index)))
 
-        convertor = Convertor()
-        convertor.edit_header(video.title)
-        for item in danmaku_list:
-            try:
-                convertor.json2ass(item)
-            except KeyError:
-                pass
-        video.save_to_disk(convertor.output(), 'ass')
+        path = video.get_location('ass')
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                convertor = Convertor(output=f)
+                convertor.edit_header(video.title)
+
+                while tasks:
+                    content = await tasks[0]
+                    tasks.popleft()
+                    if index < count:
+                        index += 1
+                        tasks.append(asyncio.create_task(fetch_segment(index)))
+                    if content:
+                        convertor.columns2ass(self.extractor.get_dm(content))
+
+                while content:
+                    index += 1
+                    if content := await fetch_segment(index):
+                        convertor.columns2ass(self.extractor.get_dm(content))
+            os.replace(tmp_path, path)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
         info('subtitle', 'save to', video.get_folder())
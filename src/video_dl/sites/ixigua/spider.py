@@ -30,7 +30,7 @@ class IXiGuaSpider(Spider):
         info('url', target_url)
 
         result = urlparse(target_url)
-        await self.fetch_html(target_url)
+        await self.fetch_html(target_url, cache=False)  # sets __ac_nonce
         meta_data = {
             'pathname': result.path,
             'href': target_url,
@@ -39,7 +39,8 @@ class IXiGuaSpider(Spider):
             'ac_nonce': self.session.cookie_jar.filter_cookies(target_url)['__ac_nonce'].value,
         }
         cookies = extractor.get_cookies(meta_data)
-        resp, _ = await self.fetch_html(target_url, cookies=cookies)
+        resp, _ = await self.fetch_html(target_url, cookies=cookies,
+                                        markers=extractor.markers)
 
         video = self.create_video()
         video.title = extractor.get_title(resp)
@@ -16,6 +16,10 @@ class PornhubExtractor(Extractor):
     re_mp4_url = re.compile(r'player_mp4_seek.*?//.*?;(.*?);flashvars', re.S)
     re_key_value = re.compile('var (.*?)=(.*)')
     re_drop_char = re.compile('[ +"]')
+    markers = [
+        ('VIDEO_SHOW', '{', '};'),  # re_video_show
+        ('player_mp4_seek', '//', ';', ';flashvars'),  # re_mp4_url
+    ]
 
     def get_title(self, resp: str) -> str:
         """get video's title from html source code."""
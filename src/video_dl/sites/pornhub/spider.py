@@ -20,8 +20,8 @@ class PornhubSpider(Spider):
             target_url: target url copied from online vide website.
         """
         info('url', target_url)
-        resp, _ = await self.fetch_html(target_url)
         extractor = Extractor.create(target_url)
+        resp, _ = await self.fetch_html(target_url, markers=extractor.markers)
 
         video = self.create_video()
         video.title = extractor.get_title(resp)
@@ -30,7 +30,7 @@ class PornhubSpider(Spider):
             info('list', 'not implemented yet!')
 
         mp4_url = extractor.get_mp4_video_url(resp)
-        mp4_dict = await self.fetch_json(mp4_url)
+        mp4_dict = await self.fetch_json(mp4_url, cache=False)  # expires soon
 
         for mp4 in mp4_dict:
             quality = mp4['quality']
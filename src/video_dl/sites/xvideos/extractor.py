@@ -16,6 +16,11 @@ class XVideosExtractor(Extractor):
         '1': re.compile(r"setVideoUrlLow\('(.*?)'\);"),
         '2': re.compile(r"setVideoUrlHigh\('(.*?)'\);"),
     }
+    markers = [
+        ("setVideoTitle('", "')"),
+        ("setVideoUrlLow('", "');"),
+        ("setVideoUrlHigh('", "');"),
+    ]
 
     def get_title(self, resp: str) -> str:
         """get video's title from html source code."""
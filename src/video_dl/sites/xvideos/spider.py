@@ -14,8 +14,8 @@ class XVideosSpider(Spider):
         info('url', self.url)
 
         target_url = self.url
-        resp, _ = await self.fetch_html(target_url)
         extractor = Extractor.create(target_url)
+        resp, _ = await self.fetch_html(target_url, markers=extractor.markers)
 
         video = self.create_video()
         video.title = extractor.get_title(resp)
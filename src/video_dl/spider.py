@@ -4,14 +4,24 @@ Typical usage:
     url = 'https://www.bilibili.com/video/BV15L411p7M8'
     spider = Spider.create(url)  # will return a BilibiliSpider object
     asycio.run(spider.run())  # try to fetch resource information and download
+
+    # spiders could share connections with each other
+    connector = Spider.create_connector()
+    await spider.run(connector)
 """
-from urllib.parse import urlparse
+from typing import Optional
 import aiohttp
 import asyncio
+import json
+import re
+import ssl
 
-from video_dl.args import Arguments
+from video_dl.args import Setting
+from video_dl.cache import is_signed
+from video_dl.extractor import MarkerScanner
+from video_dl.sites import host_suffixes, load
 from video_dl.toolbox import UserAgent, info
-from video_dl.video import Video
+from video_dl.video import Video, archive, http_cache, session
 
 
 class Spider(object):
@@ -23,30 +33,75 @@ class Spider(object):
             will auto match to a url like 'https://www.bilibili.com/video/*'.
         home_url: target website's home page. this field will be inserted into
             headers of session to avoid some `no referer, no download` policy.
+        subclasses are indexed by site once they are defined, and the site
+        should be registered in video_dl.sites, so that it could be imported
+        when a url of it is met.
 
     subclass of Spider should implement some public methods:
         before_download: do something before download, just like: parse html.
-        after_download: merge picture and sound to a completed video, delete
-            tamporary files, and et al..
+        after_video_downloaded: merge picture and sound of a video to a
+            completed one as soon as the video is downloaded, and et al..
+        after_download: do something after all videos are downloaded.
+        archive_id (optional): return an id of the video in url, so that
+            a downloaded video could be skipped with `--archive`.
     """
-    arg = Arguments()
+    cookie = Setting('cookie')
+    diretory = Setting('directory')
+    proxy = Setting('proxy')
+    lists = Setting('lists')
+    keep_alive = Setting('keep_alive')
+    keepalive_timeout = Setting('keepalive_timeout')
+    limit_per_host = Setting('limit_per_host')
+    max_videos = Setting('max_videos')
+    order = Setting('order')
+    prefer = Setting('prefer')
+
+    # created once and shared by all connectors. note that TLS sessions are
+    # never resumed by asyncio, only pooled connections (`keep_alive`) save
+    # handshakes.
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+
+    # site -> subclass of Spider
+    spiders = {}
 
-    cookie = arg.cookie
-    diretory = arg.directory
-    proxy = arg.proxy
-    url = arg.url
-    lists = arg.lists
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'site' in cls.__dict__:
+            Spider.spiders[cls.site] = cls
 
     @classmethod
     def create(cls, url: str):
         """create a specific subclass depends on url."""
-        netloc = urlparse(url).netloc
-        for subclass in cls.__subclasses__():
-            if subclass.site in netloc:
-                return subclass()
+        load(url)
+        for host in host_suffixes(url):
+            if host in cls.spiders:
+                return cls.spiders[host](url)
         raise NotImplementedError
 
-    def __init__(self):
+    @classmethod
+    def create_connector(cls) -> aiohttp.BaseConnector:
+        """create a connector, which could be shared by several sessions."""
+        if cls.keep_alive:
+            # reuse connections to the same host instead of handshaking
+            return aiohttp.connector.TCPConnector(
+                limit_per_host=cls.limit_per_host,
+                keepalive_timeout=cls.keepalive_timeout,
+                enable_cleanup_closed=True, ssl=cls.ssl_context,
+            )
+        return aiohttp.connector.TCPConnector(
+            force_close=True, enable_cleanup_closed=True,
+            ssl=cls.ssl_context,
+        )
+
+    def __init__(self, url: str):
+        """Initialize a spider.
+
+        Args:
+            url: target url copied from online video website.
+        """
+        self.url = url
         self.session = None
         self.headers = {
             'accept': '*/*',
@@ -59,14 +114,22 @@ class Spider(object):
         # list that contains Videos ready to download
         self.video_list = []
 
-    async def create_session(self) -> None:
-        """create client seesion if not exist."""
+    async def create_session(
+        self, connector: Optional[aiohttp.BaseConnector] = None
+    ) -> None:
+        """create client seesion if not exist.
+
+        Args:
+            connector: share connections with other spiders, it won't be
+                closed with this spider's session.
+        """
         if not self.session:
-            conn = aiohttp.connector.TCPConnector(
-                force_close=True, enable_cleanup_closed=True, verify_ssl=False
-            )
             self.session = aiohttp.ClientSession(
-                headers=self.headers, connector=conn, trust_env=True)
+                headers=self.headers,
+                connector=connector or self.create_connector(),
+                connector_owner=connector is None, trust_env=True,
+            )
+        session.set(self.session)  # medias download with this session
 
     async def close_session(self) -> None:
         """close client session if possible."""
@@ -76,14 +139,92 @@ class Spider(object):
     def create_video(self) -> Video:
         return Video(self.session)
 
-    async def fetch_html(self, url: str, method: str = 'get', **kwargs) -> tuple:
-        """get url's html source code from internet."""
+    def archive_id(self, url: str) -> Optional[str]:
+        """return an unique id of the video in url without fetching it.
+
+        None means the url doesn't point to a single video.
+        """
+        del url
+        return None
+
+    def is_archived(self, url: str) -> bool:
+        """whether the video in url has been downloaded."""
+        if (video_id := self.archive_id(url)) is None or not archive.get():
+            return False
+        return archive.get().has(self.site, video_id)
+
+    def archive_video(self, video: Video) -> None:
+        """record a downloaded video, it should have an archive_id."""
+        if (video_id := video.meta_data.get('archive_id')) is None:
+            return
+        if archive.get():
+            archive.get().add(self.site, video_id, video.get_location())
+
+    async def request(self, url: str, method: str = 'get',
+                      cache: bool = True, markers: Optional[list] = None,
+                      **kwargs) -> tuple:
+        """request url, return body, its encoding and url after redirection.
+
+        a GET request without other arguments except params could be served
+        by http cache, unless cache is False or url is signed.
+
+        if markers are given (see Extractor.markers), body is scanned while
+        receiving, the connection will be dropped after all markers are found
+        and body ends with the last marker.
+        """
+        store, entry = None, None
+        if (cache and method.lower() == 'get'
+                and not kwargs.keys() - {'params'} and not is_signed(url)):
+            store = http_cache.get()
+
+        if store:
+            key = store.key(method, url, kwargs.get('params'), self.cookie,
+                            markers)
+            if (entry := store.get(key)) is not None:
+                if entry.fresh:
+                    return entry.body, entry.encoding, entry.url
+                kwargs['headers'] = entry.validators()
+
         async with self.session.request(method=method, url=url, proxy=self.proxy, **kwargs) as r:
+            if r.status == 304 and entry is not None:
+                store.refresh(key, entry)
+                return entry.body, entry.encoding, entry.url
+
+            if markers:
+                body = await self._read_until(r, markers)
+            else:
+                body = await r.read()
+
+            try:
+                encoding = r.get_encoding()
+            except RuntimeError:  # no charset, and body isn't read fully
+                encoding = 'utf-8'
+
             # maybe exist redirection
             # TODO: watch out more redirections to modify index in r.history
             if r.history:
                 url = r.history[0].headers['location']  # TODO: maybe 0 -> -1
-            return await r.text(), url
+
+            if store and r.status == 200:
+                store.put(key, body, url=url, headers=r.headers,
+                          encoding=encoding)
+            return body, encoding, url
+
+    @staticmethod
+    async def _read_until(r: aiohttp.ClientResponse, markers: list) -> bytes:
+        """read body until all markers are found, or to the end."""
+        scanner = MarkerScanner(markers)
+        body = bytearray()
+        async for chunk in r.content.iter_any():
+            body += chunk
+            if scanner.feed(body):
+                return bytes(body[:scanner.end])
+        return bytes(body)
+
+    async def fetch_html(self, url: str, method: str = 'get', **kwargs) -> tuple:
+        """get url's html source code from internet (or http cache)."""
+        body, encoding, url = await self.request(url, method, **kwargs)
+        return body.decode(encoding), url
 
     async def fetch_content(self, url: str, params: None) -> str:
         """fetch content from url."""
@@ -93,34 +234,104 @@ class Spider(object):
             return await r.read()
 
     async def fetch_json(self, url: str, method: str = 'get', **kwargs) -> dict:
-        """fetch json from url."""
-        async with self.session.request(method=method, url=url, proxy=self.proxy, **kwargs) as r:
-            return await r.json()
+        """fetch json from url (or http cache)."""
+        body, encoding, _ = await self.request(url, method, **kwargs)
+        return json.loads(body.decode(encoding))
 
     async def before_download(self) -> None:
         """do something before download"""
         raise NotImplementedError
 
+    def sort_videos(self) -> list:
+        """return videos in the order they should be downloaded.
+
+        'playlist': in order of playlist.
+        'smallest': smallest (estimated) one first.
+        'priority': bigger priority first (see get_priority), and then in
+            order of playlist.
+        """
+        for position, video in enumerate(self.video_list):
+            if video.index is None:
+                video.index = position
+            if self.order == 'priority':
+                video.priority = self.get_priority(video)
+
+        if self.order == 'smallest':
+            return sorted(self.video_list, key=lambda item: item.size)
+        if self.order == 'priority':
+            return sorted(self.video_list,
+                          key=lambda item: (-item.priority, item.index))
+        return sorted(self.video_list, key=lambda item: item.index)
+
+    def get_priority(self, video: Video) -> int:
+        """return priority of a video, bigger one goes first.
+
+        videos whose title matches a pattern in `prefer` go first, the ones
+        match an earlier pattern go earlier. override it to provide hints
+        from website, e.g.: new episodes first.
+        """
+        for position, pattern in enumerate(self.prefer):
+            if re.search(pattern, video.title or ''):
+                return len(self.prefer) - position
+        return video.priority
+
     async def downloading(self) -> None:
-        """download video from web."""
-        tasks = []
+        """download video from web.
+
+        only `max_videos` videos are downloaded at the same time, so that
+        videos are completed one after another instead of all at the end.
+        a video is post processed as soon as it's downloaded, a video fails
+        if its post processing fails, the others are not affected.
+        """
         for video in self.video_list:
             video.choose_collection()
-            tasks.append(video.download())
 
-        await asyncio.gather(*tasks)
+        videos = self.sort_videos()
+        slots = asyncio.Semaphore(self.max_videos or len(videos) or 1)
+
+        async def download(video: Video) -> None:
+            async with slots:  # waiters are woken up in order
+                await video.download()
+            try:
+                await self.after_video_downloaded(video)
+            except Exception as e:  # pylint: disable=W0703
+                video.media_collection['video'].failed = True
+                info('failed', f'post processing of {video.title}: '
+                     f'{type(e).__name__} {e}')
+
+        # session will be closed after downloading, no video should be left
+        # running if something goes wrong
+        tasks = [asyncio.create_task(download(video)) for video in videos]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def after_video_downloaded(self, video: Video) -> None:
+        """do something after a video is downloaded."""
+        pass
 
     async def after_downloaded(self) -> None:
-        """do something after downloaded video."""
+        """do something after downloaded all videos."""
         pass
 
-    async def run(self) -> None:
-        """start crawl and download videos."""
-        info('site', self.site)
-        await self.create_session()
+    async def run(
+        self, connector: Optional[aiohttp.BaseConnector] = None
+    ) -> None:
+        """start crawl and download videos.
 
-        await self.before_download()
-        await self.downloading()
-        await self.after_downloaded()
+        Args:
+            connector: share connections with other spiders.
+        """
+        info('site', self.site)
+        await self.create_session(connector)
+        Video.prepare()
 
-        await self.close_session()
+        try:
+            await self.before_download()
+            await self.downloading()
+            await self.after_downloaded()
+        finally:
+            await self.close_session()
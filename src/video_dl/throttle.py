@@ -0,0 +1,103 @@
+"""Limit bandwidth of downloading with token buckets.
+
+All media share a global bucket, media from some specific hosts may draw from
+their own bucket too. Rates could be changed at runtime.
+
+Typical usage:
+    limiter = BandwidthLimiter(rate=2 * 1024 * 1024)  # 2MB/s
+    limiter.set_rate(512 * 1024, host='bilivideo.com')  # 512KB/s
+    await limiter.consume('upos-sz-mirrorcos.bilivideo.com', len(chunk))
+"""
+from typing import Optional
+import asyncio
+import time
+
+
+class TokenBucket(object):
+    """a token bucket, one token for one byte."""
+
+    def __init__(self, rate: int, burst: Optional[int] = None):
+        """Initialize a token bucket.
+
+        Args:
+            rate: bytes per second, 0 means no limit.
+            burst: capacity of bucket, default: bytes of one second.
+        """
+        self.rate = 0
+        self.burst = 0
+        self.set_rate(rate, burst)
+
+        self.tokens = self.burst
+        self._timestamp = time.monotonic()
+
+    def set_rate(self, rate: int, burst: Optional[int] = None) -> None:
+        """change rate (and capacity) of this bucket."""
+        self.rate = max(int(rate), 0)
+        self.burst = self.rate if burst is None else burst
+
+    def _refill(self) -> None:
+        """put tokens into bucket according to elapsed time."""
+        now = time.monotonic()
+        self.tokens = min(
+            self.tokens + (now - self._timestamp) * self.rate, self.burst)
+        self._timestamp = now
+
+    async def consume(self, amount: int) -> None:
+        """take tokens from bucket, wait until debts are paid if necessary."""
+        if self.rate == 0:
+            return
+
+        self._refill()
+        self.tokens -= amount
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class BandwidthLimiter(object):
+    """a global token bucket and several per host token buckets."""
+
+    def __init__(self, rate: Optional[int] = 0,
+                 host_rates: Optional[dict] = None):
+        """Initialize a bandwidth limiter.
+
+        Args:
+            rate: global bytes per second, 0 means no limit.
+            host_rates: bytes per second of specific hosts. a host will match
+                its subdomains, e.g.: 'bilivideo.com' -> 'a.bilivideo.com'.
+        """
+        self.bucket = TokenBucket(rate)
+        self.host_buckets = {}
+        for host, host_rate in (host_rates or {}).items():
+            self.set_rate(host_rate, host=host)
+
+    def set_rate(self, rate: int, host: Optional[str] = None) -> None:
+        """change global rate, or rate of a specific host."""
+        if host is None:
+            self.bucket.set_rate(rate)
+        elif host in self.host_buckets:
+            self.host_buckets[host].set_rate(rate)
+        else:
+            self.host_buckets[host] = TokenBucket(rate)
+
+    def rates(self) -> dict:
+        """return global rate and rates of specific hosts."""
+        return {
+            'rate': self.bucket.rate,
+            'hosts': {host: bucket.rate
+                      for host, bucket in self.host_buckets.items()},
+        }
+
+    def _find_bucket(self, host: str) -> Optional[TokenBucket]:
+        """find bucket of host or its nearest parent domain."""
+        labels = (host or '').split('.')
+        for index in range(len(labels)):
+            bucket = self.host_buckets.get('.'.join(labels[index:]))
+            if bucket is not None:
+                return bucket
+        return None
+
+    async def consume(self, host: str, amount: int) -> None:
+        """wait until amount bytes from host are allowed."""
+        await self.bucket.consume(amount)
+        if (bucket := self._find_bucket(host)) is not None:
+            await bucket.consume(amount)
@@ -4,13 +4,16 @@ Avaliable function:
     UserAgent().random: get a random user agent.
     info: print prompt message.
     ask_user: ask user to provide a string of numbers.
+    parse_size: convert a human readable size to bytes.
 
 Typical usage:
     random_ua = UserAgent().random
     info('url', 'https://www.bilibili.com/video/xxx')
     video_index, audio_index = ask_user(count=2, default=1)
+    rate = parse_size('2M')  # 2097152
 """
 from typing import Optional
+import json
 import os
 import random
 import readline  # pylint: disable=W0611
@@ -58,8 +61,19 @@ class ConsoleColor(object):
     UNDERLINE = '\033[4m'
 
 
+class Output(object):
+    """how should messages be printed."""
+    json = False  # print json lines instead of colorful text
+
+
 def info(label: str, *args, **kwargs) -> None:
     """print information to console with colors."""
+    if Output.json:
+        message = ' '.join(str(item) for item in args)
+        print(json.dumps({'event': 'info', 'label': label, 'message': message},
+                         ensure_ascii=False), flush=True)
+        return
+
     print(f'{ConsoleColor.WARNING}[{label}]{ConsoleColor.OKGREEN}',
           *args, ConsoleColor.ENDC, **kwargs)
 
@@ -83,3 +97,19 @@ def ask_user(count: Optional[int] = 2, default: Optional[int] = 1) -> tuple:
         return result[0]
     else:
         return result
+
+
+def parse_size(size) -> int:
+    """convert a size like '512K', '2M' or '1G' to bytes.
+
+    Args:
+        size: a number, or a string ends with an optional unit.
+    """
+    if isinstance(size, (int, float)):
+        return int(size)
+
+    size = size.strip().upper().rstrip('B')
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(float(size))
@@ -5,8 +5,18 @@ separately in differrent place. So, if we want to download a complete video,
 we should download video and audio (I say, media) first, and then merge them to
 one.
 
-when downloading a single media, if its size exceeds a certain threshold,
-program will slice it to many fragments and download with different coroutine.
+when downloading a single media, program will slice it to many fragments and
+download them with different coroutines. fragments start small and grow up to
+a certain threshold, an idle coroutine will steal half of the slowest fragment.
+if a media could be fetched from several urls, fragments will be spread across
+them according to their speed.
+every fragment is written to its own position of the (preallocated) target
+file by worker threads, so fragments never need to be concatenated. completed
+fragments are recorded in a manifest next to the media, so that an interrupted
+download could be resumed with `--resume`.
+
+medias could also be fed to ffmpeg through pipes while downloading, so that
+only the merged video will be written to disk (`--stream-merge`).
 
 Available function:
     - Media().download: download a media from internet.
@@ -17,8 +27,8 @@ Typical usage example:
     media1 = Media(**{'url': 'url1', size: '1', desc: '.'})
     media2 = Media(**{'url': 'url2', size: '2', desc: '.'})
     media_collection = MediaCollation([media1, media2])
-    media_collection.download()
-    media_collection.merge()  # if necessary
+    await media_collection.download()
+    await media_collection.merge()  # if necessary
 """
 from typing import List, Optional
 import aiohttp
@@ -26,150 +36,346 @@ import asyncio
 import contextvars
 import math
 import os
+import random
+import time
 import subprocess
 
 from prettytable import PrettyTable
 
-from video_dl.args import Arguments
-from video_dl.toolbox import ConsoleColor, info, ask_user
+from video_dl.archive import Archive
+from video_dl.args import Setting
+from video_dl.cache import HttpCache
+from video_dl.manifest import Manifest
+from video_dl.mirror import MirrorPool
+from video_dl.progress import Progress
+from video_dl.scheduler import Range, RangeScheduler
+from video_dl.throttle import BandwidthLimiter
+from video_dl.toolbox import info, ask_user, parse_size
+from video_dl.writer import ByteBudget, FileWriter, PipeWriter
 
 
 session = contextvars.ContextVar('Aiohttp.ClientSession', default=None)
 semaphore = contextvars.ContextVar('asyncio.Semaphore', default=None)
+limiter = contextvars.ContextVar('BandwidthLimiter', default=None)
+progress = contextvars.ContextVar('Progress', default=None)
+write_budget = contextvars.ContextVar('ByteBudget', default=None)
+merge_slots = contextvars.ContextVar('Merge.Semaphore', default=None)
+archive = contextvars.ContextVar('Archive', default=None)
+http_cache = contextvars.ContextVar('HttpCache', default=None)
+
+
+class DownloadError(Exception):
+    """media couldn't be downloaded completely."""
+
+
+async def _wait(tasks: List[asyncio.Task],
+                return_when: Optional[str] = asyncio.ALL_COMPLETED) -> tuple:
+    """same as asyncio.wait, but tasks are cancelled if caller is cancelled.
+
+    e.g.: a job is cancelled in daemon mode, all its connections should be
+    closed instead of running in background.
+    """
+    try:
+        return await asyncio.wait(tasks, return_when=return_when)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
 
 
 class Media(object):
     """Class used to handle media."""
-    args = Arguments()
-
-    _threshold = args.big_file_threshold
-    _proxy = args.proxy
+    _threshold = Setting('big_file_threshold')
+    _min_chunk = Setting('min_chunk_size')
+    _max_conn = Setting('max_conn')
+    _proxy = Setting('proxy')
+    _resume = Setting('resume')
+    _preallocate = Setting('preallocate')
+    _buffer_size = Setting('write_buffer_size')
+    _fsync = Setting('fsync')
+    _max_retries = Setting('max_retries')
+    _backoff = Setting('retry_backoff')
+    _backoff_max = Setting('retry_backoff_max')
+    _timeout = Setting('read_timeout', lambda timeout: aiohttp.ClientTimeout(
+        total=None, sock_read=timeout))
 
     def __init__(self, *, url: str,
                  size: Optional[int] = 0,
-                 desc: Optional[str] = 'null'):
+                 desc: Optional[str] = 'null',
+                 backup_urls: Optional[List[str]] = None):
         """Initialize a media object.
 
         Args:
             url: target url.
             size: media's file size. will be used to sort.
             desc: description of media, default: null.
+            backup_urls: urls of the same media from other servers.
         """
         self.url = url  # download media from this url
         self.size = size  # file size fetched from server, will be used to sort
         self.desc = desc  # description for choosing by user
 
+        # ranges will be spread across all equivalent urls
+        self.mirrors = MirrorPool([url] + (backup_urls or []))
+
         # download to this location, will be changed by MediaCollection outside
         self.location = None
 
-        # file size during downloading, will be used to draw a progress bar.
-        self._current_size = 0
+        # name of the video contains this media, used to group progress
+        self.group = None
 
-    def _get_location(self, index: Optional[int] = 0) -> str:
-        """get media slice's target storage path.
+        # downloading progress, will be registered before downloading
+        self._progress = None
 
-        insert a index into file's name and return.
-
-        Args:
-            index: index of media slice. defalut value is 0 means no slice.
+        # write bytes to target file in worker threads
+        self._writer = None
 
-        Returns:
-            media slice's target storage location. e.g.: ./media_p2.mp4.
-        """
-        if index == 0:
-            return self.location
-        else:
-            folder, name = os.path.split(self.location)
-            title, suffix = os.path.splitext(name)
-            return os.path.join(folder, f'{title}_p{index}{suffix}')
+        # completed byte ranges, will be created before downloading
+        self._manifest = None
 
     async def _set_size(self) -> None:
         """set media file's real size by parsing server's response headers."""
         headers = {'range': 'bytes=0-1'}
-        async with session.get().get(
-            url=self.url, headers=headers, proxy=self._proxy
-        ) as r:
-            self.size = int(r.headers['Content-Range'].split('/')[1])
-
-    def _get_headers(self, index: Optional[int] = 0) -> dict:
-        """get a headers should be sent to server for downloading a media slice
+        for retries in range(self._max_retries + 1):
+            if retries:
+                await asyncio.sleep(random.uniform(
+                    0, min(self._backoff * 2 ** retries, self._backoff_max)))
+
+            mirror = self.mirrors.choose()
+            try:
+                async with session.get().get(
+                    url=mirror.url, headers=headers, proxy=self._proxy,
+                    timeout=self._timeout,
+                ) as r:
+                    r.raise_for_status()
+                    self.size = int(r.headers['Content-Range'].split('/')[1])
+                    return
+            except (aiohttp.ClientError, asyncio.TimeoutError, KeyError) as e:
+                self.mirrors.fail(mirror)
+                error = f'{type(e).__name__} {e}'.strip()
+
+        raise DownloadError(f'failed to get size of {self.url}: {error}')
+
+    def _allocate(self, preallocate: bool) -> None:
+        """create target file with the same size as media.
+
+        bytes already on disk will be kept if we are resuming a download.
+        runs in a worker thread, which can't read arguments of current
+        context, so `preallocate` is passed in.
+        """
+        mode = 'r+b' if self._manifest.ranges else 'wb'
+        if mode == 'r+b' and not os.path.isfile(self.location):
+            mode = 'wb'
+
+        with open(self.location, mode) as f:
+            if preallocate and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, self.size)
+                    return
+                except OSError:  # file system doesn't support it
+                    pass
+            f.truncate(self.size)
+
+    async def download(self, writer: Optional[PipeWriter] = None) -> None:
+        """download media to target location.
 
         Args:
-            index: index of media slice. begin with 1.
-                default value 0 means no slice.
-
-        Returns:
-            a request header with slice range. defalut: {}.
+            writer: write media to a pipe instead of target location, bytes
+                will be downloaded in order by a single connection.
         """
-        if index == 0:
-            return {}
-
-        slice_point = range(0, self.size, self._threshold)
-        start_point = slice_point[index - 1]
-        end_point = min(start_point + self._threshold - 1, self.size - 1)
-        return {'range': f'bytes={start_point}-{end_point}'}
-
-    async def download(self) -> None:
-        """download media to target location."""
         info('ready to download', os.path.split(self.location)[1])
 
-        await self._set_size()
-        if self.size <= self._threshold:  # don't need silce
-            await self._download_slice()
-            print()  # avoid overwritten
+        # pipe is owned by this media from now on, close it even if its
+        # size couldn't be fetched
+        try:
+            await self._set_size()
+        except BaseException:
+            if writer is not None:
+                await writer.close()
+            raise
+
+        if writer is None:
+            self._manifest = Manifest(self.location)
+            if self._resume:
+                if (os.path.isfile(self.location)
+                        and not os.path.exists(self._manifest.path)
+                        and os.path.getsize(self.location) == self.size):
+                    info('skip', f'{os.path.split(self.location)[1]} is ready')
+                    return
+                self._manifest.load(self.size)
+            else:
+                self._manifest.size = self.size
+
+            # manifest must exist before target file has its full size,
+            # otherwise an interrupted download looks like a completed one.
+            self._manifest.save()
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._allocate, self._preallocate)
+            self._writer = FileWriter(
+                self.location, budget=write_budget.get(),
+                buffer_size=self._buffer_size, fsync=self._fsync,
+            )
+            ranges = self._manifest.missing(0, self.size)
+            completed = self._manifest.completed
+            workers, slots = self._max_conn, semaphore.get()
         else:
-            # slice media, create task and run
-            slice_count = math.ceil(self.size / self._threshold)
-            await asyncio.wait([
-                asyncio.create_task(self._download_slice(index + 1))
-                for index in range(slice_count)
-            ])
-
-            print()  # avoid overwritten
-            info('slices2one', f'merging to {os.path.split(self.location)[1]}')
-            with open(self.location, 'wb') as f:
-                for index in range(slice_count):
-                    target = self._get_location(index + 1)
-                    with open(target, 'rb') as media_slice:
-                        f.write(media_slice.read())
-                    os.remove(target)
+            # the reader of pipe (ffmpeg) may wait for another media before
+            # reading this one, so this connection shouldn't occupy the
+            # shared slots which another media is waiting for.
+            self._writer = writer
+            ranges, completed = [(0, self.size)], 0
+            workers, slots = 1, asyncio.Semaphore(1)
+
+        self._progress = progress.get().register(
+            os.path.split(self.location)[1], self.size,
+            group=self.group, completed=completed,
+        )
+
+        # every connection asks scheduler for ranges until nothing left, and
+        # writes them to their own position of target file. scheduler splits
+        # pending bytes, so there could be a connection per min_chunk bytes.
+        scheduler = RangeScheduler(
+            ranges, min_chunk=self._min_chunk, max_chunk=self._threshold,
+        )
+        missing = sum(stop - start for start, stop in scheduler.pending)
+        workers = min(workers, math.ceil(missing / scheduler.min_chunk))
+        tasks = [
+            asyncio.create_task(self._download_worker(scheduler, slots))
+            for _ in range(workers)
+        ]
+        done = set()
+        try:
+            if tasks:
+                done, _ = await _wait(tasks)
+        except asyncio.CancelledError:
+            self._progress.finish(failed=True)
+            raise
+        finally:
+            await self._writer.close()
+
+        for task in done:
+            if (error := task.exception()) is not None:
+                self._progress.finish(failed=True)
+                info('failed', f'{os.path.split(self.location)[1]} is '
+                     f'incomplete ({error}), try again with --resume')
+                raise DownloadError(self.location) from error
+
+        self._progress.finish()
+        if self._manifest is not None:
+            self._manifest.remove()
+
+    async def _download_worker(self, scheduler: RangeScheduler,
+                               slots: asyncio.Semaphore) -> None:
+        """keep downloading ranges handed out by scheduler.
+
+        a broken range will be continued from the last received byte after a
+        while, DownloadError will be raised if it's still broken after
+        several retries.
 
-    async def _download_slice(self, index: Optional[int] = 0) -> None:
-        """download media slice from internet.
+        Args:
+            scheduler: hands out ranges should be downloaded.
+            slots: limits connections opened simultaneously.
+        """
+        media_slice, retries = None, 0
+        try:
+            while True:
+                async with slots:
+                    if media_slice is None:
+                        media_slice, retries = scheduler.next(), 0
+                        if media_slice is None:
+                            return
+
+                    try:
+                        await self._download_slice(media_slice)
+                        error = 'connection closed early'
+                    except (aiohttp.ClientError, asyncio.TimeoutError,
+                            DownloadError) as e:
+                        error = f'{type(e).__name__} {e}'.strip()
+
+                if media_slice.remaining == 0:
+                    scheduler.finish(media_slice)
+                    media_slice = None
+                    continue
+
+                retries += 1
+                if retries > self._max_retries:
+                    raise DownloadError(f'gave up at byte '
+                                        f'{media_slice.position}: {error}')
+
+                # exponential backoff with full jitter
+                delay = random.uniform(
+                    0, min(self._backoff * 2 ** retries, self._backoff_max))
+                info('retry', f'{os.path.split(self.location)[1]} from byte '
+                     f'{media_slice.position} in {delay:.1f}s, {error}')
+                await asyncio.sleep(delay)
+        finally:
+            if media_slice is not None:
+                scheduler.finish(media_slice)
+
+    async def _download_slice(self, media_slice: Range) -> None:
+        """download a media slice and write it to target file.
+
+        slice's stop may be reduced by other connection during downloading,
+        we just stop reading when reaching it. the slice is downloaded from
+        the best mirror at this moment, mirror's speed will be updated.
 
-        @param index: index of media slice which we want to download.
-                    default value 0 means no slice.
+        Args:
+            media_slice: byte range which should be downloaded.
         """
-        target = self._get_location(index)  # get target location to save media
-        headers = self._get_headers(index)  # get headers to send to server
-
-        async with semaphore.get():
-            async with session.get().get(
-                url=self.url, headers=headers, proxy=self._proxy
-            ) as r:
-                with open(target, 'wb') as f:
-                    async for chunk in r.content.iter_any():
-                        f.write(chunk)
+        start = media_slice.position
+        headers = {'range': f'bytes={start}-{media_slice.stop - 1}'}
+        stream = self._writer.stream(start)
+        mirror = self.mirrors.choose()
+        start_time = time.monotonic()
 
-                        self._current_size += len(chunk)
-                        self._print_progress()
+        try:
+            with mirror:
+                async with session.get().get(
+                    url=mirror.url, headers=headers, proxy=self._proxy,
+                    timeout=self._timeout,
+                ) as r:
+                    r.raise_for_status()
+                    if r.status != 206 and start != 0:
+                        raise DownloadError('server ignored range request')
 
-    def _print_progress(self) -> None:
-        """print a naive progress bar."""
-        progress = int(self._current_size / self.size * 20)
-        print('\r', ConsoleColor.WARNING, '[downloading] ',
-              ConsoleColor.OKGREEN,
-              f'[{self._current_size/self.size*100:3.0f}%]',  # percent
-              f'({self._current_size/1024/1024:6.2f}/',  # current_size
-              f'{self.size/1024/1024:6.2f}MB)|',  # total_size
-              'x' * progress, '.' * (20 - progress),  # naive progress bar
-              ' ', ConsoleColor.OKCYAN, os.path.split(self.location)[1],
-              ConsoleColor.ENDC, '\r', ConsoleColor.ENDC, sep='', end='')
+                    async for chunk in r.content.iter_any():
+                        await limiter.get().consume(mirror.host, len(chunk))
+
+                        # stop may be reduced by a thief while waiting, claim
+                        # bytes before stop only, so that none of them is
+                        # written or counted twice
+                        chunk = chunk[:media_slice.remaining]
+                        media_slice.position += len(chunk)
+                        self._progress.advance(len(chunk))
+                        await stream.write(chunk)
+
+                        if media_slice.remaining == 0:
+                            break
+        except Exception:
+            self.mirrors.fail(mirror)
+            raise
+        else:
+            self.mirrors.record(mirror, media_slice.position - start,
+                                time.monotonic() - start_time)
+        finally:
+            # only bytes which have been written to target file are received,
+            # the others will be downloaded again
+            try:
+                await stream.flush()
+            finally:
+                if stream.written < media_slice.position:
+                    self._progress.advance(
+                        stream.written - media_slice.position)
+                    media_slice.position = stream.written
+                if self._manifest is not None:
+                    self._manifest.add(start, stream.written)
 
 
 class MediaCollection(list):
     """class for handle list of medias."""
-    arg = Arguments()
+    stream_merge = Setting('stream_merge')
+    write_buffer_size = Setting('write_buffer_size')
 
     def __init__(self, members: List[Media] = None, *,
                  salt: Optional[str] = ''):
@@ -185,6 +391,8 @@ class MediaCollection(list):
 
         self.salt = salt
         self.location = None  # will be set by Video outsite.
+        self.failed = False  # some medias couldn't be downloaded
+        self.merged = False  # medias have been merged while downloading
 
     def get_location(self) -> str:
         """return media collection's location, add salt."""
@@ -199,13 +407,80 @@ class MediaCollection(list):
         """add media resource into media collection."""
         if media.location is None:
             media.location = self.get_location()
+        media.group = os.path.split(self.location)[1]
         super().append(media)
 
     async def download(self) -> None:
         """download all medias contained in this collection."""
-        await asyncio.wait([
+        if self.stream_merge and len(self) > 1 and os.name == 'posix':
+            await self._download_and_merge()
+            return
+
+        done, _ = await _wait([
             asyncio.create_task(item.download()) for item in self
         ])
+        self.failed = any(task.exception() for task in done)
+
+    async def _download_and_merge(self) -> None:
+        """feed medias to ffmpeg through pipes while downloading them.
+
+        medias will never be saved to disk, only the merged one will.
+        """
+        info('merge', f'streaming to {self.location} ...')
+
+        pipes = [os.pipe() for _ in self]
+        cmd = ['ffmpeg']
+        for read_fd, _ in pipes:
+            cmd += ['-i', f'pipe:{read_fd}']
+        cmd += ['-codec', 'copy', self.location, '-y']
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL, pass_fds=[fd for fd, _ in pipes],
+            )
+        except OSError:
+            for read_fd, write_fd in pipes:
+                os.close(read_fd)
+                os.close(write_fd)
+            info('warn', 'check your ffmpeg!')
+            self.failed = True
+            return
+
+        for read_fd, _ in pipes:
+            os.close(read_fd)
+
+        writers = [
+            PipeWriter(write_fd, buffer_size=self.write_buffer_size)
+            for _, write_fd in pipes
+        ]
+        tasks = [asyncio.create_task(item.download(writer))
+                 for item, writer in zip(self, writers)]
+        try:
+            done, pending = await _wait(
+                tasks, return_when=asyncio.FIRST_EXCEPTION)
+            if pending:  # ffmpeg will never finish, stop it and other medias
+                process.kill()
+                done |= (await asyncio.wait(pending))[0]
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            if os.path.exists(self.location):
+                os.remove(self.location)
+            raise
+        finally:
+            # a media cancelled before starting never closes its pipe
+            for writer in writers:
+                await writer.close()
+
+        returncode = await process.wait()
+        self.failed = (any(task.exception() for task in done)
+                       or returncode != 0)
+        self.merged = not self.failed
+        if self.failed:
+            info('warn', f'failed to stream to {self.location}!')
+            if os.path.exists(self.location):
+                os.remove(self.location)
 
     def __str__(self):
         """print this media collection with pretty format."""
@@ -217,12 +492,21 @@ class MediaCollection(list):
             ])
         return tb.get_string()
 
-    def merge(self) -> None:
+    async def merge(self) -> bool:
         """merge all medias into a complete one.
 
-        only workable after all medias are ready.
+        only workable after all medias are ready. ffmpeg runs in a subprocess,
+        processes running simultaneously are limited by merge slots.
+
+        Returns:
+            whether the merged video is ready.
         """
-        info('merge', f'merging to {self.location} ...')
+        if self.merged:
+            return True
+
+        if self.failed:
+            info('merge', f'skip {self.location}, some medias are incomplete')
+            return False
 
         # command line command
         cmd = ['ffmpeg']
@@ -230,15 +514,32 @@ class MediaCollection(list):
             cmd += ['-i', item.location]
         cmd += ['-codec', 'copy', self.location, '-y']
 
-        # call command provided by opration system
-        try:
-            subprocess.run(cmd,
-                           stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT,
-                           check=True)
-            for item in self:
-                os.remove(item.location)
-        except Exception:  # pylint: disable=W0703
-            info('warn', 'check your ffmpeg!')
+        async with merge_slots.get():
+            info('merge', f'merging to {self.location} ...')
+            start_time = time.monotonic()
+
+            # call command provided by opration system
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd, stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                )
+                _, stderr = await process.communicate()
+            except OSError:
+                info('warn', 'check your ffmpeg!')
+                return False
+
+        if process.returncode != 0:
+            message = stderr.decode('utf-8', 'replace').strip().split('\n')
+            info('warn', f'failed to merge {self.location}: {message[-1]}')
+            return False
+
+        for item in self:
+            os.remove(item.location)
+        self.merged = True
+        info('merged', f'{os.path.split(self.location)[1]} in '
+             f'{time.monotonic() - start_time:.2f}s')
+        return True
 
     def sort_media(self, reverse: bool = True) -> None:
         """sort medias in media collection, biggest one will be the first."""
@@ -247,12 +548,56 @@ class MediaCollection(list):
 
 class Video(object):
     """presents a video."""
-    arg = Arguments()
+    directory = Setting('directory')
+    interactive = Setting('interactive')
+    lists = Setting('lists')
+    max_conn = Setting('max_conn')
+    rate_limit = Setting('rate_limit', parse_size)
+    host_rate_limit = Setting('host_rate_limit', lambda limits: {
+        key: parse_size(value) for key, value in limits.items()})
+    progress_mode = Setting('progress')
+    progress_interval = Setting('progress_interval')
+    write_budget = Setting('write_budget')
+    merge_workers = Setting('merge_workers')
+    archive_path = Setting('archive')
+    cache_dir = Setting('cache_dir')
+    cache_ttl = Setting('cache_ttl')
+    cache_max_size = Setting('cache_max_size')
+
+    @classmethod
+    def prepare(cls) -> None:
+        """create resources shared by all videos if not exist.
+
+        call it before creating tasks, if these tasks should share resources.
+        """
+        if not semaphore.get():
+            semaphore.set(asyncio.Semaphore(cls.max_conn))
+
+        # all medias draw from the same limiter, see BandwidthLimiter.set_rate
+        # to adjust it at runtime
+        if not limiter.get():
+            limiter.set(BandwidthLimiter(cls.rate_limit, cls.host_rate_limit))
+
+        if not progress.get():
+            progress.set(Progress(cls.progress_mode, cls.progress_interval))
+
+        # bytes waiting to be written by all medias
+        if not write_budget.get():
+            write_budget.set(ByteBudget(cls.write_budget))
+
+        # ffmpeg processes running simultaneously
+        if not merge_slots.get():
+            merge_slots.set(asyncio.Semaphore(
+                cls.merge_workers or os.cpu_count() or 1))
 
-    directory = arg.directory
-    interactive = arg.interactive
-    lists = arg.lists
-    max_conn = arg.max_conn
+        # downloaded videos, disabled if no path is given
+        if cls.archive_path and not archive.get():
+            archive.set(Archive(cls.archive_path))
+
+        # pages and api responses, disabled if no directory is given
+        if cls.cache_dir and not http_cache.get():
+            http_cache.set(HttpCache(cls.cache_dir, ttl=cls.cache_ttl,
+                                     max_size=cls.cache_max_size))
 
     def __init__(self, client_session: aiohttp.ClientSession,
                  suffix: Optional[str] = 'mp4'):
@@ -264,9 +609,7 @@ class Video(object):
         """
         if not session.get():
             session.set(client_session)
-
-        if not semaphore.get():
-            semaphore.set(asyncio.Semaphore(self.max_conn))
+        self.prepare()
 
         # attributes read from config file or user's input
         self.root_folder = self.directory
@@ -287,10 +630,25 @@ class Video(object):
         # used to hold something else
         self.meta_data = {}
 
+        # used by spider to decide which video should be downloaded first
+        self.index = None  # position in playlist
+        self.priority = 0  # bigger one goes first, see Spider.get_priority
+
     @property
     def title(self) -> str:
         return self._title
 
+    @property
+    def size(self) -> int:
+        """estimated size of the chosen medias, before they are downloaded.
+        """
+        return sum(media.size for media in self.media_collection['video'])
+
+    @property
+    def failed(self) -> bool:
+        """whether some medias of this video couldn't be downloaded."""
+        return self.media_collection['video'].failed
+
     @title.setter
     def title(self, value: str) -> None:
         for char in ['?', '*', ':', '"', '<', '>', '\\', '/', '|']:
@@ -303,9 +661,12 @@ class Video(object):
             return os.path.join(self.root_folder, self.parent_folder)
         return self.root_folder
 
-    def get_location(self) -> str:
-        """return video's store location."""
-        return os.path.join(self.get_folder(), f'{self._title}.{self.suffix}')
+    def get_location(self, suffix: Optional[str] = None) -> str:
+        """return video's store location, or something else's with the same
+        name but different suffix.
+        """
+        return os.path.join(self.get_folder(),
+                            f'{self._title}.{suffix or self.suffix}')
 
     def add_media(self, media: Media, target: Optional[str] = 'video') -> None:
         """add a media to the specific media collection.
@@ -355,7 +716,8 @@ class Video(object):
             self.add_media(self.media_collection['sound'][a - 1])
 
         info('choosed', '↓↓↓↓↓↓↓↓↓↓↓')
-        print(self.media_collection['video'])
+        if self.progress_mode != 'json':
+            print(self.media_collection['video'])
 
         # save memory
         del self.media_collection['picture']
@@ -371,13 +733,27 @@ class Video(object):
 
         await self.media_collection['video'].download()
 
-    def merge(self) -> None:
+    async def merge(self) -> bool:
         """merge medias contained in video media collection."""
-        self.media_collection['video'].merge()
+        return await self.media_collection['video'].merge()
+
+    def to_dict(self) -> dict:
+        """return a dictionary describes this video and its medias."""
+        return {
+            'title': self.title,
+            'index': self.index,
+            'size': self.size,
+            'location': self.get_location() if self.title else None,
+            'failed': self.failed,
+            'medias': {
+                target: [{'url': media.url, 'size': media.size,
+                          'desc': media.desc} for media in collection]
+                for target, collection in self.media_collection.items()
+            },
+            'meta_data': self.meta_data,
+        }
 
     def save_to_disk(self, content: str, suffix: str) -> None:
         """save something to disk with same name but different suffix."""
-        path, _ = os.path.splitext(self.get_location())
-        path = f'{path}.{suffix}'
-        with open(path, 'w', encoding='utf-8') as f:
+        with open(self.get_location(suffix), 'w', encoding='utf-8') as f:
             f.write(content)
@@ -0,0 +1,227 @@
+"""Write downloaded bytes to disk without blocking the event loop.
+
+Small chunks received from a connection are coalesced into a big buffer, full
+buffers are written to their own position of target file by worker threads.
+Bytes submitted but not written yet are limited by a budget shared by all
+writers, so that a slow disk will slow down connections instead of eating up
+memory.
+
+PipeWriter has the same interface, but only accepts bytes in order, it's used
+to feed a media to another process (e.g.: ffmpeg) while downloading. a pipe
+may be blocked by its reader for a long time (ffmpeg reads inputs as their
+timestamps go), so it has its own budget of a single buffer instead of the
+shared one, otherwise a blocked pipe would stall all the others.
+
+Typical usage:
+    budget = ByteBudget(64 * 1024 * 1024)
+    writer = FileWriter('video.mp4', budget=budget, buffer_size=1024 * 1024)
+    stream = writer.stream(offset=0)
+    await stream.write(b'...')
+    await stream.flush()  # all bytes written above are on disk now
+    await writer.close()
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import asyncio
+import os
+import threading
+
+
+class ByteBudget(object):
+    """limit bytes which are waiting to be written."""
+
+    def __init__(self, limit: int):
+        """Initialize a byte budget.
+
+        Args:
+            limit: maximum bytes in flight.
+        """
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, size: int) -> None:
+        """wait until there is enough budget for size bytes.
+
+        a request bigger than limit is allowed when nothing is in flight.
+        """
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self.in_flight == 0
+                or self.in_flight + size <= self.limit
+            )
+            self.in_flight += size
+
+    async def release(self, size: int) -> None:
+        """give back budget of size bytes."""
+        async with self._condition:
+            self.in_flight -= size
+            self._condition.notify_all()
+
+
+class FileWriter(object):
+    """write bytes to any position of an existing file in worker threads."""
+    fsync_policies = ('never', 'range', 'close')
+    executor = None  # default executor of event loop
+
+    def __init__(self, path: str, *, budget: ByteBudget, buffer_size: int,
+                 fsync: Optional[str] = 'never'):
+        """Initialize a file writer.
+
+        Args:
+            path: target file, should have been created.
+            budget: shared budget of bytes in flight.
+            buffer_size: chunks will be coalesced up to this size.
+            fsync: 'never', 'range' (when a stream is flushed) or 'close'.
+        """
+        if fsync not in self.fsync_policies:
+            raise ValueError(f'fsync should be one of {self.fsync_policies}, '
+                             f'got {fsync!r}')
+
+        self.budget = budget
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+
+        self._fd = os.open(path, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+        self._lock = threading.Lock()  # used when os.pwrite is missing
+
+    def stream(self, offset: int) -> 'WriteStream':
+        """return a stream writing bytes from offset continuously."""
+        return WriteStream(self, offset)
+
+    def _write(self, data: bytes, offset: int) -> None:
+        """write data at offset, called in worker threads."""
+        if hasattr(os, 'pwrite'):
+            while data:
+                size = os.pwrite(self._fd, data, offset)
+                data, offset = data[size:], offset + size
+        else:
+            with self._lock:
+                os.lseek(self._fd, offset, os.SEEK_SET)
+                while data:
+                    data = data[os.write(self._fd, data):]
+
+    async def sync(self) -> None:
+        """flush file's data to disk."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, os.fsync, self._fd)
+
+    async def close(self) -> None:
+        """close file, streams should have been flushed."""
+        if self.fsync == 'close':
+            await self.sync()
+        os.close(self._fd)
+
+
+class PipeWriter(object):
+    """write bytes to a pipe in a dedicated thread, bytes must be in order."""
+    fsync = 'never'
+
+    def __init__(self, fd: int, *, buffer_size: int):
+        """Initialize a pipe writer.
+
+        Args:
+            fd: write end of a pipe, will be closed by this writer.
+            buffer_size: chunks will be coalesced up to this size.
+        """
+        # a buffer is submitted after the previous one is written
+        self.budget = ByteBudget(buffer_size)
+        self.buffer_size = buffer_size
+
+        self._fd = fd
+        self._position = 0  # next byte should be written
+
+        # a single thread keeps submitted buffers in order
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def stream(self, offset: int) -> 'WriteStream':
+        """return a stream writing bytes from offset continuously."""
+        return WriteStream(self, offset)
+
+    def _write(self, data: bytes, offset: int) -> None:
+        """write data to pipe, called in worker thread."""
+        if offset != self._position:
+            raise ValueError(f'expect byte {self._position}, got {offset}')
+
+        self._position += len(data)
+        while data:
+            data = data[os.write(self._fd, data):]
+
+    async def close(self) -> None:
+        """close pipe, so that the reader will get an EOF.
+
+        it's safe to close a pipe more than once.
+        """
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, os.close, fd)
+        self.executor.shutdown(wait=False)
+
+
+class WriteStream(object):
+    """coalesce continuous chunks and submit them to a writer."""
+
+    def __init__(self, writer: FileWriter, offset: int):
+        self.writer = writer
+        self.offset = offset  # where the buffer will be written
+        self.written = offset  # bytes before it have been written
+
+        self._buffer = bytearray()
+        self._pending = []  # (where the data ends, write task)
+
+    async def write(self, data: bytes) -> None:
+        """append data to buffer, submit it when buffer is full."""
+        self._buffer += data
+        if len(self._buffer) >= self.writer.buffer_size:
+            await self._submit()
+
+    async def _submit(self) -> None:
+        """hand the buffer over to a worker thread."""
+        if not self._buffer:
+            return
+
+        # buffer is kept if cancelled while waiting
+        await self.writer.budget.acquire(len(self._buffer))
+        data = bytes(self._buffer)
+        self._buffer.clear()
+
+        self.offset += len(data)
+        self._pending.append((self.offset, asyncio.ensure_future(
+            self._write(data, self.offset - len(data)))))
+
+    async def _write(self, data: bytes, offset: int) -> None:
+        """write data in a worker thread, release budget when done."""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self.writer.executor, self.writer._write, data, offset)
+        finally:
+            await self.writer.budget.release(len(data))
+
+    async def flush(self) -> None:
+        """wait until all bytes written to this stream are on disk.
+
+        if it fails or is cancelled, only bytes before `written` are
+        guaranteed to be written.
+        """
+        try:
+            await self._submit()
+            await asyncio.gather(*[task for _, task in self._pending])
+        finally:
+            self._settle()
+
+        if self.writer.fsync == 'range':
+            await self.writer.sync()
+
+    def _settle(self) -> None:
+        """move `written` forward over writes finished in order."""
+        while self._pending:
+            end, task = self._pending[0]
+            if (not task.done() or task.cancelled()
+                    or task.exception() is not None):
+                break
+            self.written = end
+            self._pending.pop(0)